@@ -0,0 +1,158 @@
+# core/auth.py
+"""
+자체 발급 access token(JWT, HS256) 발급 / 검증 + FastAPI dependency.
+
+- 키: JWT_KEYS="kid1:secret1,kid2:secret2", 서명은 JWT_ACTIVE_KID 로.
+  JWT_KEYS 가 없으면 JWT_SECRET 하나를 kid "default" 로 쓴다.
+  검증은 header 의 kid 로 키를 고르므로, 키 교체 중에는 이전 kid 를 JWT_KEYS 에 남겨 두면 된다.
+- exp 필수 (JWT_TTL 초, 기본 7일)
+- 프로필(location/age/sex)을 "prof" 클레임으로 실어서, 읽기 API 는 userinform 을 다시 조회하지 않는다.
+  post_inform / update_inform 이 프로필을 바꾸면 새 토큰을 발급하고,
+  같은 프로세스에서 그 이후에 바뀐 것으로 알려진 프로필 클레임은 버린다 (DB 로 대체).
+- 기존 클라이언트를 위해 Authorization 헤더가 없으면 email 파라미터를 그대로 받는다.
+  AUTH_REQUIRED=1 이면 토큰 없는 요청은 401.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from core.config import env_bool, env_int
+from schemas.auth import Principal, ProfileClaims
+from services.profile_events import changed_since
+
+try:
+    import jwt
+except Exception:  # optional at dev time; real env will install deps
+    jwt = None
+
+JWT_ALGORITHM = "HS256"
+JWT_TTL = env_int("JWT_TTL", 7 * 24 * 3600)
+PROFILE_CLAIMS_VERSION = 1
+DEFAULT_KID = "default"
+
+
+def _signing_keys() -> Tuple[Dict[str, str], str]:
+    """(kid → secret, 서명용 kid)."""
+    keys: Dict[str, str] = {}
+    for item in os.getenv("JWT_KEYS", "").split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if sep and kid and secret:
+            keys[kid] = secret
+    if not keys:
+        keys[DEFAULT_KID] = os.getenv("JWT_SECRET", "dev-secret")
+    active = os.getenv("JWT_ACTIVE_KID") or next(iter(keys))
+    if active not in keys:
+        raise HTTPException(status_code=500, detail=f"JWT_ACTIVE_KID {active!r} is not in JWT_KEYS")
+    return keys, active
+
+
+def profile_claims(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """userinform row(dict) → prof 클레임."""
+    if profile is None:
+        return None
+    return ProfileClaims(
+        v=PROFILE_CLAIMS_VERSION,
+        location=profile.get("location"),
+        age=profile.get("age"),
+        sex=profile.get("sex"),
+        at=time.time(),
+    ).model_dump()
+
+
+def issue_token(
+    email: str,
+    sub: Optional[str] = None,
+    name: Optional[str] = None,
+    profile: Optional[Dict[str, Any]] = None,
+) -> str:
+    if jwt is None:
+        raise HTTPException(status_code=500, detail="PyJWT not installed")
+    keys, kid = _signing_keys()
+    now = int(time.time())
+    claims: Dict[str, Any] = {
+        "sub": sub,
+        "email": email,
+        "name": name,
+        "iat": now,
+        "exp": now + JWT_TTL,
+    }
+    prof = profile_claims(profile)
+    if prof is not None:
+        claims["prof"] = prof
+    return jwt.encode(claims, keys[kid], algorithm=JWT_ALGORITHM, headers={"kid": kid})
+
+
+def decode_token(token: str) -> Principal:
+    if jwt is None:
+        raise HTTPException(status_code=500, detail="PyJWT not installed")
+    keys, _ = _signing_keys()
+    try:
+        kid = jwt.get_unverified_header(token).get("kid") or DEFAULT_KID
+        secret = keys.get(kid)
+        if secret is None:
+            raise HTTPException(status_code=401, detail="Unknown token key")
+        claims = jwt.decode(token, secret, algorithms=[JWT_ALGORITHM], options={"require": ["exp"]})
+    except jwt.ExpiredSignatureError as exc:
+        raise HTTPException(status_code=401, detail="Token expired") from exc
+    except jwt.InvalidTokenError as exc:
+        raise HTTPException(status_code=401, detail="Invalid token") from exc
+    if not claims.get("email"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    profile = None
+    prof = claims.get("prof")
+    if isinstance(prof, dict) and prof.get("v") == PROFILE_CLAIMS_VERSION:
+        profile = ProfileClaims(**prof)
+        # 이 토큰 발급 이후 프로필이 바뀐 게 알려져 있으면 클레임은 쓰지 않음
+        if changed_since(claims["email"], profile.at):
+            profile = None
+    return Principal(
+        email=claims["email"],
+        sub=claims.get("sub"),
+        name=claims.get("name"),
+        kid=kid,
+        exp=claims["exp"],
+        profile=profile,
+    )
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def optional_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Optional[Principal]:
+    """Authorization: Bearer 가 있으면 검증해서 Principal, 없으면 None (잘못된 토큰은 401)."""
+    if credentials is None:
+        if env_bool("AUTH_REQUIRED"):
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        return None
+    return decode_token(credentials.credentials)
+
+
+def resolve_email(email: Optional[str], principal: Optional[Principal]) -> str:
+    """토큰이 있으면 토큰의 email (파라미터와 다르면 403), 없으면 기존처럼 email 파라미터."""
+    if principal is not None:
+        if email and email != principal.email:
+            raise HTTPException(status_code=403, detail="email does not match the access token")
+        return principal.email
+    if not email:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return email
+
+
+def principal_profile(principal: Optional[Principal]) -> Optional[Dict[str, Any]]:
+    """토큰의 프로필 클레임을 userinform row 모양(dict)으로 (없거나 오래됐으면 None)."""
+    if principal is None or principal.profile is None:
+        return None
+    return {
+        "email": principal.email,
+        "location": principal.profile.location,
+        "age": principal.profile.age,
+        "sex": principal.profile.sex,
+    }
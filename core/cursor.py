@@ -0,0 +1,30 @@
+# core/cursor.py
+"""keyset 페이지네이션의 after 커서 (정렬 키 값 목록 ↔ 불투명한 문자열). 라우터 공용."""
+import base64
+import json
+from typing import Any, List, Sequence
+
+from fastapi import HTTPException
+
+
+def encode_key(key: Sequence[Any]) -> str:
+    """keyset 정렬 키 → 불투명한 after 커서 문자열."""
+    raw = json.dumps(list(key), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_key(cursor: str, types: Sequence[type]) -> List[Any]:
+    """encode_key 의 역. 값 개수 / 타입이 types 와 다르면 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded).decode("utf-8"))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="잘못된 after 커서입니다.") from exc
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        # bool 은 int 의 하위 타입이라 따로 막는다
+        or any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(key, types))
+    ):
+        raise HTTPException(status_code=400, detail="잘못된 after 커서입니다.")
+    return key
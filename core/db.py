@@ -0,0 +1,338 @@
+# core/db.py
+"""
+앱 전체가 공유하는 PostgreSQL 커넥션 풀.
+
+- main.py lifespan 에서 init_pool() / close_pool() 호출
+- 라우터는 `with connection() as conn:` 으로 빌려 쓰고 반납
+- 풀이 꽉 차서 DB_POOL_TIMEOUT 안에 못 빌리면 503
+- async 라우트는 psycopg2 를 직접 부르지 말고 `await run_db(fn, ...)` 로 스레드에 넘긴다
+  (core.lanes 의 db lane, 챗봇은 자기 lane 인 llm 을 쓴다)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+import psycopg2
+import psycopg2.extensions
+from fastapi import HTTPException
+
+from core.config import env_float, env_int
+from core.lanes import run_in_lane
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolExhausted(Exception):
+    """timeout 안에 커넥션을 확보하지 못함."""
+
+
+class _PooledConn:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    psycopg2 기반의 스레드 세이프한 bounded 풀.
+
+    - min_size 만큼 미리 열어두고 max_size 까지 늘어남
+    - checkout 시 health check(SELECT 1) → 죽은 커넥션은 버리고 새로 연결
+    - max_lifetime / max_idle 을 넘긴 커넥션은 재활용하지 않고 교체
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        health_check_after: float = 5.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.dsn = dsn
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        # 직전 사용 후 이 시간(초)이 지난 커넥션만 SELECT 1 로 확인
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: List[_PooledConn] = []
+        self._in_use: Dict[int, _PooledConn] = {}
+        self._opening = 0
+        self._closed = False
+
+        # 모니터링용 카운터
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._broken = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        for _ in range(self.min_size):
+            try:
+                self._idle.append(_PooledConn(self._connect()))
+            except psycopg2.Error as exc:
+                # DB 가 잠깐 죽어 있어도 앱 기동은 되도록
+                logger.warning("DB pool warm-up failed: %s", exc)
+                break
+
+    # ----------------------------
+    # 내부 유틸
+    # ----------------------------
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+    @staticmethod
+    def _discard(pc: _PooledConn) -> None:
+        try:
+            pc.conn.close()
+        except Exception:
+            pass
+
+    def _is_stale(self, pc: _PooledConn, now: float) -> bool:
+        if pc.conn.closed:
+            return True
+        if self.max_lifetime and now - pc.created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - pc.last_used > self.max_idle:
+            return True
+        return False
+
+    def _is_healthy(self, pc: _PooledConn, now: float) -> bool:
+        if now - pc.last_used < self.health_check_after:
+            return True
+        try:
+            with pc.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            pc.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ----------------------------
+    # checkout / checkin
+    # ----------------------------
+    def getconn(self, timeout: Optional[float] = None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            pc = None
+            must_open = False
+            with self._cond:
+                if self._closed:
+                    raise PoolExhausted("pool is closed")
+                while not self._idle and len(self._in_use) + self._opening >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolExhausted(
+                            f"no connection available within {timeout:.1f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    # 가장 최근에 쓴 커넥션부터 (LIFO) → 오래된 건 idle 로 자연스럽게 정리
+                    pc = self._idle.pop()
+                else:
+                    self._opening += 1
+                    must_open = True
+
+            if must_open:
+                try:
+                    pc = _PooledConn(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                break
+
+            # 락 밖에서 검사 (SELECT 1 이 네트워크를 타므로)
+            now = time.monotonic()
+            if self._is_stale(pc, now):
+                self._discard(pc)
+                with self._cond:
+                    self._recycled += 1
+                continue
+            if not self._is_healthy(pc, now):
+                self._discard(pc)
+                with self._cond:
+                    self._broken += 1
+                continue
+            break
+
+        wait = time.monotonic() - start
+        with self._cond:
+            self._in_use[id(pc.conn)] = pc
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += wait
+            self._wait_time_max = max(self._wait_time_max, wait)
+        return pc.conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        with self._cond:
+            pc = self._in_use.pop(id(conn), None)
+            if pc is None:
+                return
+            if close or self._closed or conn.closed:
+                self._discard(pc)
+            else:
+                try:
+                    # 트랜잭션이 열린 채로 돌아오면 정리
+                    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    pc.last_used = time.monotonic()
+                    self._idle.append(pc)
+                except Exception:
+                    self._broken += 1
+                    self._discard(pc)
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            for pc in self._idle:
+                self._discard(pc)
+            self._idle.clear()
+            for pc in self._in_use.values():
+                self._discard(pc)
+            self._in_use.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "checkouts": checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "broken": self._broken,
+                "wait_time_avg_ms": round(self._wait_time_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            }
+
+
+# ============================
+# 앱 전역 풀
+# ============================
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool() -> Optional[ConnectionPool]:
+    """lifespan 시작 시 호출. DATABASE_URL 이 없으면 None."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        dsn = os.getenv("DATABASE_URL")
+        if not dsn:
+            logger.warning("DATABASE_URL not set; DB pool disabled")
+            return None
+        _pool = ConnectionPool(
+            dsn,
+            min_size=env_int("DB_POOL_MIN", 1),
+            max_size=env_int("DB_POOL_MAX", 10),
+            timeout=env_float("DB_POOL_TIMEOUT", 5.0),
+            max_lifetime=env_float("DB_POOL_MAX_LIFETIME", 1800.0),
+            max_idle=env_float("DB_POOL_MAX_IDLE", 300.0),
+        )
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def get_pool() -> ConnectionPool:
+    # lifespan 이 안 도는 환경(서버리스 콜드스타트 등)을 위해 lazy init
+    pool = _pool or init_pool()
+    if pool is None:
+        raise HTTPException(status_code=500, detail="DATABASE_URL is not set")
+    return pool
+
+
+@contextmanager
+def connection() -> Iterator[Any]:
+    """
+    풀에서 커넥션을 빌려주는 컨텍스트 매니저.
+    정상 종료면 commit, 예외면 rollback 후 반납한다.
+    """
+    pool = get_pool()
+    try:
+        conn = pool.getconn()
+    except PoolExhausted as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="데이터베이스 연결이 모두 사용 중입니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "1"},
+        ) from exc
+    except psycopg2.Error as exc:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {exc}") from exc
+
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except BaseException as exc:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        if isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+def pool_stats() -> Dict[str, Any]:
+    if _pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **_pool.stats()}
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    동기 DB 함수를 이벤트 루프 밖(db lane 스레드)에서 실행.
+    async def 라우트에서 psycopg2 를 쓰는 경우 반드시 이걸 거친다.
+    """
+    return await run_in_lane("db", fn, *args, **kwargs)
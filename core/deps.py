@@ -0,0 +1,16 @@
+# core/deps.py
+"""라우터 공용 FastAPI dependency."""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """운영용 엔드포인트 보호: X-Admin-Token 헤더를 ADMIN_TOKEN 과 비교."""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN is not configured")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
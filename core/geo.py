@@ -0,0 +1,142 @@
+# core/geo.py
+"""
+위경도 유틸 + 격자(grid) 공간 인덱스.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Callable, Dict, Generic, Iterator, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_DEG_LAT = 111_320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """두 좌표 사이의 대원 거리(m)."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class GridIndex(Generic[T]):
+    """
+    cell_deg 간격의 격자 버킷에 점을 나눠 담는 인덱스.
+    경기도 범위(수십~수만 건)에서는 k-d tree 보다 단순하고 충분히 빠르다.
+    경도 ±180 경계를 넘는 거리(wrap)는 고려하지 않는다.
+    """
+
+    def __init__(
+        self,
+        items: Sequence[T],
+        coords: Callable[[T], Tuple[float, float]],
+        cell_deg: float = 0.01,
+    ):
+        self.cell_deg = cell_deg
+        self._coords = coords
+        self.items = list(items)
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for idx, item in enumerate(self.items):
+            lat, lng = coords(item)
+            self.cells.setdefault(self.cell_of(lat, lng), []).append(idx)
+        if self.cells:
+            rows = [c[0] for c in self.cells]
+            cols = [c[1] for c in self.cells]
+            self._extent = (min(rows), max(rows), min(cols), max(cols))
+        else:
+            self._extent = (0, 0, 0, 0)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> List[T]:
+        r0, c0 = self.cell_of(min_lat, min_lng)
+        r1, c1 = self.cell_of(max_lat, max_lng)
+        n_cells = (r1 - r0 + 1) * (c1 - c0 + 1)
+
+        # 넓은 박스면 빈 칸까지 도는 대신 채워진 칸만 훑는다
+        if n_cells > len(self.cells):
+            candidates = (
+                idx
+                for (r, c), bucket in self.cells.items()
+                if r0 <= r <= r1 and c0 <= c <= c1
+                for idx in bucket
+            )
+        else:
+            candidates = (
+                idx
+                for r in range(r0, r1 + 1)
+                for c in range(c0, c1 + 1)
+                for idx in self.cells.get((r, c), ())
+            )
+
+        out: List[T] = []
+        for idx in candidates:
+            item = self.items[idx]
+            lat, lng = self._coords(item)
+            if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                out.append(item)
+        return out
+
+    def _ring_cells(self, cr: int, cc: int, ring: int) -> Iterator[Tuple[int, int]]:
+        """(cr, cc) 중심 ring 번째 링의 테두리 칸 중 데이터 범위(extent) 안에 있는 칸만."""
+        rmin, rmax, cmin, cmax = self._extent
+        r0, r1, c0, c1 = cr - ring, cr + ring, cc - ring, cc + ring
+        clo, chi = max(c0, cmin), min(c1, cmax)
+        if clo <= chi:
+            for r in (r0, r1) if ring else (r0,):
+                if rmin <= r <= rmax:
+                    for c in range(clo, chi + 1):
+                        yield (r, c)
+        if not ring:
+            return
+        rlo, rhi = max(r0 + 1, rmin), min(r1 - 1, rmax)
+        if rlo <= rhi:
+            for c in (c0, c1):
+                if cmin <= c <= cmax:
+                    for r in range(rlo, rhi + 1):
+                        yield (r, c)
+
+    def nearest(self, lat: float, lng: float, k: int, max_distance_m: float = math.inf) -> List[Tuple[float, T]]:
+        """
+        가까운 순 (거리 m, item) k 개. 중심 칸에서 링을 넓혀가며 찾는다.
+        링마다 데이터 범위 안의 테두리 칸만 보고, 범위 밖의 점이면 범위에 닿는 링부터 시작한다.
+        """
+        if k <= 0 or not self.items:
+            return []
+        cr, cc = self.cell_of(lat, lng)
+        rmin, rmax, cmin, cmax = self._extent
+        # 링 하나를 넘어갈 때 최소로 늘어나는 거리 (경도 방향이 더 짧으므로 그쪽 기준,
+        # 질문 지점과 데이터 중 극에 가장 가까운 위도에서의 경도 간격으로 잡는다)
+        max_abs_lat = min(max(abs(lat), abs(rmin * self.cell_deg), abs((rmax + 1) * self.cell_deg)), 90.0)
+        ring_m = self.cell_deg * METERS_PER_DEG_LAT * max(math.cos(math.radians(max_abs_lat)), 1e-6)
+        first_ring = max(rmin - cr, cr - rmax, cmin - cc, cc - cmax, 0)
+        max_ring = max(abs(cr - rmin), abs(cr - rmax), abs(cc - cmin), abs(cc - cmax))
+        if first_ring and (first_ring - 1) * ring_m > max_distance_m:
+            return []  # 데이터 범위가 반경 밖
+
+        heap: List[Tuple[float, int]] = []  # (-dist, idx) max-heap
+        for ring in range(first_ring, max_ring + 1):
+            for cell in self._ring_cells(cr, cc, ring):
+                for idx in self.cells.get(cell, ()):
+                    ilat, ilng = self._coords(self.items[idx])
+                    d = haversine_m(lat, lng, ilat, ilng)
+                    if d > max_distance_m:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, idx))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, idx))
+            # 다음 링의 어떤 점도 지금 k번째보다 가까울 수 없으면 종료
+            bound = ring * ring_m
+            if bound > max_distance_m or (len(heap) == k and bound > -heap[0][0]):
+                break
+
+        return [(-nd, self.items[idx]) for nd, idx in sorted(heap, reverse=True)]
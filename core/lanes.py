@@ -0,0 +1,130 @@
+# core/lanes.py
+"""
+이름 붙은 스레드 실행 lane.
+
+Starlette 기본 threadpool(anyio, 40개)을 모든 동기 라우트가 같이 쓰면
+느린 쪽(챗봇 컨텍스트 조회, Google 인증서 요청 등)이 자리를 다 차지해서
+짧은 CRUD 까지 같이 밀린다. lane 마다 CapacityLimiter 를 따로 두어
+한 의존성이 느려져도 그 lane 에 묶인 엔드포인트만 느려지게 한다.
+
+- llm  : 챗봇 턴에서 도는 동기 작업 (컨텍스트/카탈로그 조회, 세션 저장소, 색인 생성)
+- db   : 일반 CRUD 라우트 (welfare / inform / map 위치 조회)
+- auth : 외부 인증 호출 (Google ID token 검증)
+
+크기는 LANE_<NAME>_SIZE 환경변수로 조정.
+
+사용:
+    await run_in_lane("db", fn, *args)
+
+    @router.get(...)
+    @on_lane("db")
+    def handler(...): ...     # FastAPI 에는 async 라우트로 보이고 본문은 db lane 스레드에서 실행
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, TypeVar
+
+import anyio
+import anyio.to_thread
+
+from core.config import env_int
+
+T = TypeVar("T")
+
+
+class Lane:
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self._limiter = anyio.CapacityLimiter(size)
+        self._waits: Deque[float] = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_wait = 0.0
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        queued_at = time.monotonic()
+        self.submitted += 1
+
+        def call() -> T:
+            waited = time.monotonic() - queued_at
+            with self._lock:
+                self._waits.append(waited)
+                self.max_wait = max(self.max_wait, waited)
+            return fn(*args, **kwargs)
+
+        try:
+            result = await anyio.to_thread.run_sync(call, limiter=self._limiter)
+        except BaseException:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        limiter = self._limiter.statistics()
+        with self._lock:
+            waits = sorted(self._waits)
+            max_wait = self.max_wait
+        p50 = waits[len(waits) // 2] if waits else 0.0
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "size": self.size,
+            "active": limiter.borrowed_tokens,
+            "queued": limiter.tasks_waiting,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_ms_p50": round(p50 * 1000, 2),
+            "wait_ms_p95": round(p95 * 1000, 2),
+            "wait_ms_max": round(max_wait * 1000, 2),
+        }
+
+
+LANES: Dict[str, Lane] = {
+    "llm": Lane("llm", env_int("LANE_LLM_SIZE", 16)),
+    "db": Lane("db", env_int("LANE_DB_SIZE", 16)),
+    "auth": Lane("auth", env_int("LANE_AUTH_SIZE", 8)),
+}
+
+
+def get_lane(name: str) -> Lane:
+    try:
+        return LANES[name]
+    except KeyError:
+        raise ValueError(f"unknown executor lane: {name!r}") from None
+
+
+async def run_in_lane(name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await get_lane(name).run(fn, *args, **kwargs)
+
+
+def on_lane(name: str) -> Callable[[Callable[..., T]], Callable[..., Any]]:
+    """동기 라우트 함수를 지정한 lane 에서 실행하는 async 라우트로 감싼다 (시그니처 유지)."""
+    lane = get_lane(name)
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            return await lane.run(fn, *args, **kwargs)
+
+        # FastAPI 는 문자열 annotation 을 wrapper 의 모듈 기준으로 풀기 때문에
+        # (from __future__ import annotations) 원래 모듈 기준으로 미리 풀어 둔다
+        try:
+            wrapper.__signature__ = inspect.signature(fn, eval_str=True)  # type: ignore[attr-defined]
+        except (NameError, TypeError):
+            pass
+        return wrapper
+
+    return decorator
+
+
+def lane_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: lane.stats() for name, lane in LANES.items()}
@@ -0,0 +1,96 @@
+# core/loop_monitor.py
+"""
+이벤트 루프 블로킹 감지기 (디버그용).
+
+루프 안의 heartbeat 태스크가 주기적으로 시각을 찍고,
+별도 watchdog 스레드가 그 시각이 threshold 이상 멈춰 있으면
+루프 스레드의 현재 스택을 로그로 남긴다 → 어떤 코드가 루프를 막았는지 바로 보인다.
+
+LOOP_BLOCK_DETECT=1 일 때만 main.py lifespan 에서 켠다.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopBlockDetector:
+    def __init__(self, threshold: float = 0.1):
+        self.threshold = threshold
+        self.interval = max(threshold / 4, 0.005)
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.blocks = 0
+        self.max_block = 0.0
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        reported = False
+        started = 0.0
+        while not self._stop.wait(self.interval):
+            lag = time.monotonic() - self._beat
+            if lag < self.threshold:
+                if reported:
+                    duration = time.monotonic() - started
+                    self.max_block = max(self.max_block, duration)
+                    logger.warning("event loop unblocked after %.0f ms", duration * 1000)
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            started = self._beat
+            self.blocks += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            logger.warning(
+                "event loop blocked for more than %.0f ms; loop thread stack:\n%s",
+                self.threshold * 1000,
+                stack,
+            )
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        # 루프 자체 debug 모드의 slow callback 로그도 같은 기준으로
+        loop.slow_callback_duration = self.threshold
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-block-detector", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "max_block_ms": round(self.max_block * 1000, 1),
+        }
@@ -0,0 +1,72 @@
+# core/ratelimit.py
+"""
+토큰 버킷 rate limiter (프로세스 내부).
+
+- TokenBucket: capacity 만큼 쌓이고 초당 rate 씩 차는 버킷
+- KeyedBuckets: 키(사용자 등)별 버킷, LRU 로 개수 상한
+여러 버킷을 한 번에 검사한 뒤 모두 통과할 때만 차감하려면 wait_time() → take() 순서로 쓴다.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "_clock")
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount 를 꺼낼 수 있을 때까지 남은 초 (0 이면 지금 가능). capacity 보다 큰 요청은 가득 찰 때 허용."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class KeyedBuckets:
+    def __init__(self, rate: float, capacity: float, max_keys: int = 50_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            self._buckets.move_to_end(key)
+            # 오래 안 쓴 버킷은 어차피 가득 차 있으므로 버려도 동작은 같다
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._buckets), "rate": self.rate, "capacity": self.capacity}
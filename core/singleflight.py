@@ -0,0 +1,76 @@
+# core/singleflight.py
+"""
+asyncio 용 요청 합치기(single-flight) + 키별 직렬화 락.
+
+- SingleFlight: 같은 키로 동시에 들어온 호출은 첫 호출이 만든 task 하나를 같이 기다린다.
+  task 로 돌리므로 먼저 온 클라이언트가 끊겨도 나머지는 결과를 받는다.
+- KeyedLocks: 키(세션 등)별 asyncio.Lock. 쓰는 쪽이 없으면 바로 정리해서 메모리가 쌓이지 않는다.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        # 기다리던 쪽이 취소돼도 공유 task 는 계속 돈다
+        return await asyncio.shield(task)
+
+    def inflight(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # 기다리는 쪽이 모두 떠났을 때 "exception was never retrieved" 경고 방지
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"inflight": len(self._tasks), "calls": self.calls, "coalesced": self.coalesced}
+
+
+class KeyedLocks:
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._users: Dict[Hashable, int] = {}
+        self.contended = 0
+
+    @asynccontextmanager
+    async def hold(self, key: Optional[Hashable]) -> AsyncIterator[None]:
+        """key 가 None 이면 잠그지 않는다 (새로 만드는 세션 등)."""
+        if key is None:
+            yield
+            return
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+        if lock.locked():
+            self.contended += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"held": len(self._locks), "contended": self.contended}
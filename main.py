@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -8,8 +10,48 @@ from fastapi.middleware.cors import CORSMiddleware
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
 load_dotenv(BASE_DIR.parent / ".env", override=False)
+from core import db
+from core.config import env_bool, env_float
+from core.lanes import lane_stats, run_in_lane
+from core.loop_monitor import LoopBlockDetector
+from services.facility_store import facility_store
+from services.google_certs import google_verifier
+from services.profile_repo import profile_repo
+from services.schema import check_schema
+from services.gyeonggi_api import facility_client
+from services.session_store import run_reaper
 from routers import welfare, chatbot, auth, map, user_inform
-app = FastAPI(title="GyeonggiD+ Backend")
+
+
+loop_detector = LoopBlockDetector(threshold=env_float("LOOP_BLOCK_THRESHOLD_MS", 100.0) / 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if env_bool("LOOP_BLOCK_DETECT"):
+        loop_detector.start()
+    if db.init_pool() is not None:
+        # repository 의 ON CONFLICT (email) 가 기대하는 unique index 등이 있는지 확인만 한다.
+        # 적용은 배포 단계의 `python -m services.schema` (없거나 DB 가 죽어 있으면 경고 로그)
+        await run_in_lane("db", check_schema)
+    await facility_client.start()
+    facility_store.load()
+    # 첫 로그인이 인증서 다운로드를 기다리지 않도록
+    certs_warmup = asyncio.create_task(run_in_lane("auth", google_verifier.certs.warm))
+    reaper = asyncio.create_task(
+        run_reaper(chatbot.session_store, env_float("SESSION_REAP_INTERVAL", 60.0))
+    )
+    try:
+        yield
+    finally:
+        reaper.cancel()
+        certs_warmup.cancel()
+        await facility_client.aclose()
+        db.close_pool()
+        await loop_detector.stop()
+
+
+app = FastAPI(title="GyeonggiD+ Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,3 +80,27 @@ def ping():
 def api_health():
     """Standardized health endpoint for load balancers / uptime checks."""
     return {"status": "ok"}
+
+
+@app.get("/api/metrics/db-pool")
+def db_pool_metrics():
+    """DB 커넥션 풀 상태 (in_use / idle / 대기 시간)."""
+    return db.pool_stats()
+
+
+@app.get("/api/metrics/profile-cache")
+def profile_cache_metrics():
+    """userinform 프로필 캐시 적중률 / DB 조회 수."""
+    return profile_repo.stats()
+
+
+@app.get("/api/metrics/lanes")
+def executor_lane_metrics():
+    """lane(llm / db / auth)별 스레드 사용량, 대기열 길이, 대기 시간."""
+    return lane_stats()
+
+
+@app.get("/api/metrics/event-loop")
+def event_loop_metrics():
+    """LOOP_BLOCK_DETECT=1 일 때 감지된 이벤트 루프 블로킹 횟수."""
+    return loop_detector.stats()
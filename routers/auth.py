@@ -1,13 +1,13 @@
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
 
 import os
 
 
 
-from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as google_requests
- # optional at dev time; real env will install deps
+from schemas.auth import Principal
 from schemas.user_inform import UserInformBody,GoogleVerifyBody
 
 
@@ -18,27 +18,32 @@ except Exception:
 
 import psycopg2  # 👈 DB 연동 추가
 
+from core.auth import issue_token, optional_principal, principal_profile, resolve_email
+from core.lanes import on_lane
+from services.google_certs import google_verifier
+from services.profile_events import notify_profile_changed
+from services.profile_repo import profile_repo
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-db_url = os.getenv("DATABASE_URL")
-
-
 @router.post("/google/verify")
+@on_lane("auth")
 def google_verify(body: GoogleVerifyBody):
     client_id = os.getenv("GOOGLE_CLIENT_ID")
     if not client_id:
         raise HTTPException(status_code=500, detail="Server misconfigured: GOOGLE_CLIENT_ID not set")
 
-    if google_id_token is None or google_requests is None:
+    if not google_verifier.available:
         raise HTTPException(status_code=500, detail="google-auth not installed")
 
     if jwt is None:
         raise HTTPException(status_code=500, detail="PyJWT not installed")
 
     try:
-        info = google_id_token.verify_oauth2_token(body.id_token, google_requests.Request(), client_id)
+        # 인증서는 캐시에서, 같은 토큰은 exp 까지 memo (services.google_certs)
+        info = google_verifier.verify(body.id_token, client_id)
     except Exception as e:
         logger.warning("Google token verification failed: %s", e, exc_info=True)
         raise HTTPException(status_code=401, detail="Invalid Google ID token") from e
@@ -58,33 +63,22 @@ def google_verify(body: GoogleVerifyBody):
     # ============================
     email = payload.get("email")
     db_url = os.getenv("DATABASE_URL")
+    profile = None  # 토큰에 실을 프로필 클레임 (읽기 API 가 userinform 을 다시 조회하지 않도록)
 
     if not db_url:
         logger.warning("DATABASE_URL not set; skipping userinform insert")
     elif not email:
         logger.warning("No email in Google token; skipping userinform insert")
     else:
-        conn = None
-        cur = None
         try:
-            conn = psycopg2.connect(db_url)
-            cur = conn.cursor()
-
-            # email이 이미 있는지 확인
-            cur.execute("SELECT 1 FROM userinform WHERE email = %s", (email,))
-            exists = cur.fetchone()
-
-            # 없으면 새로 INSERT (age/location/sex는 일단 빈 문자열)
-            if not exists:
-                cur.execute(
-                    "INSERT INTO userinform (email, age, location, sex) VALUES (%s, %s, %s, %s)",
-                    (email, 0, "", "")
-                )
-                conn.commit()
-                cur.close()
-                conn.close()
-                secret = os.getenv("JWT_SECRET", "dev-secret")
-                token = jwt.encode({**payload}, secret, algorithm="HS256")
+            # 캐시에 있으면 DB 없이, 없으면 INSERT ... ON CONFLICT 한 문장으로
+            # "없으면 만들고 있으면 기존 행" (age/location/sex는 일단 빈 값, 캐시도 같이 갱신)
+            profile = profile_repo.get(email) if profile_repo.cached(email) else None
+            created = False
+            if profile is None:
+                profile, created = profile_repo.create_if_missing(email)
+            if created:
+                token = issue_token(email, sub=payload["sub"], name=payload["name"], profile=profile)
                 return {
                     "user": "new user",
                     "email": email,
@@ -98,100 +92,71 @@ def google_verify(body: GoogleVerifyBody):
             # DB 문제 때문에 로그인 자체를 막고 싶지 않으면, 여기서는 그냥 로그만 남김
             logger.error("Failed to upsert user in userinform: %s", e, exc_info=True)
             return {"error",e}
-        finally:
-            if cur is not None:
-                try:
-                    cur.close()
-                except Exception:
-                    pass
-            if conn is not None:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
 
     # ============================
-    # ② 기존 JWT 발급 로직 그대로 유지
+    # ② JWT 발급 (kid / exp / 프로필 클레임 포함, core.auth)
     # ============================
-    secret = os.getenv("JWT_SECRET", "dev-secret")
-    token = jwt.encode({**payload}, secret, algorithm="HS256")
+    token = issue_token(email, sub=payload["sub"], name=payload["name"], profile=profile)
 
     return {"access_token": token, "token_type": "bearer", "user": payload}
 
 
-@router.post("/post_inform")
-def post_inform(body: UserInformBody):
+@router.get("/google/stats")
+def google_verify_stats():
+    """Google 인증서 캐시 / 검증 memo 상태."""
+    return google_verifier.stats()
 
-    conn = psycopg2.connect(db_url)
-    cur = conn.cursor()
 
-    # 1. 이메일 존재 확인
-    cur.execute("SELECT 1 FROM userinform WHERE email = %s", (body.email,))
-    result = cur.fetchone()
+@router.post("/post_inform")
+@on_lane("db")
+def post_inform(body: UserInformBody, principal: Optional[Principal] = Depends(optional_principal)):
+    resolve_email(body.email, principal)
 
-    if not result:
+    # 1. 나이 / 지역 / 성별 업데이트 (UPDATE ... RETURNING 한 문장, 없는 email 이면 None)
+    updated = profile_repo.update(body.email, age=body.age, location=body.location, sex=body.sex)
+    if updated is None:
         raise HTTPException(status_code=404, detail="User with this email does not exist")
 
+    # 2. 세션 컨텍스트 등 프로필 기반 캐시 무효화 (프로필 캐시는 update 가 갱신)
+    notify_profile_changed(body.email)
 
-    # 2. 나이 / 지역 / 성별 업데이트
-    cur.execute(
-        """
-        UPDATE userinform
-        SET age = %s,
-            location = %s,
-            sex = %s
-        WHERE email = %s
-        """,
-        (body.age, body.location, body.sex, body.email)
-    )
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    return {
+    response = {
         "code": 200,
         "message": "User info updated successfully",
     }
+    # 3. 토큰으로 호출했으면 바뀐 프로필 클레임으로 재발급
+    if principal is not None:
+        response["access_token"] = issue_token(
+            principal.email,
+            sub=principal.sub,
+            name=principal.name,
+            profile={"location": body.location, "age": body.age, "sex": body.sex},
+        )
+        response["token_type"] = "bearer"
+    return response
 
 def get_inform_fun(email:str):
-    database = psycopg2.connect(db_url)
-    sql = """
-                SELECT 
-                email,
-                location,
-                age,
-                sex
-            FROM userinform
-            WHERE email = %s
-            LIMIT 1
-            """
-
     try:
-        with database as conn, conn.cursor() as cur:
-            cur.execute(sql, (email,))
-            row = cur.fetchone()
-
-            if not row:
-                raise HTTPException(status_code=404, detail="해당 이메일의 유저 정보를 찾을 수 없습니다.")
-
-            # row 는 튜플이라 변환
-            user = {
-                "email": row[0],
-                "location": row[1],
-                "age": row[2],
-                "sex": row[3],
-            }
+        # email / location / age / sex (profile_repo 캐시 경유)
+        user = profile_repo.get(email)
+        if not user:
+            raise HTTPException(status_code=404, detail="해당 이메일의 유저 정보를 찾을 수 없습니다.")
 
-            return {"success": True, "user": user}
+        return {"success": True, "user": user}
 
     except psycopg2.Error as exc:
         raise HTTPException(status_code=500, detail=f"DB 조회 오류: {exc}")
 @router.get("/get_inform")
-def get_inform(email:str):
+@on_lane("db")
+def get_inform(email: Optional[str] = None, principal: Optional[Principal] = Depends(optional_principal)):
     """
         userinform 테이블에서 email로 유저 정보를 조회하는 API
+        (access token 에 프로필 클레임이 있으면 DB 조회 없이 그대로)
         """
+    email = resolve_email(email, principal)
+    profile = principal_profile(principal)
+    if profile is not None:
+        return {"success": True, "user": profile}
     return get_inform_fun(email)
 
 
@@ -1,85 +1,79 @@
 # main.py
-import os
+import asyncio
+import hashlib
+import json
+import logging
 import time
-from uuid import uuid4
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
-from fastapi import APIRouter
-from openai import OpenAI
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 
+from core.auth import optional_principal, principal_profile, resolve_email
+from core.cache import TTLCache
+from core.config import env_float, env_int
+from core.singleflight import KeyedLocks, SingleFlight
+from core.lanes import run_in_lane
+from schemas.auth import Principal
 from schemas.chat import ChatResponse, ChatRequest
-from routers.welfare import get_welfare_list
+from routers.welfare import get_welfare_catalog
 from routers.auth import get_inform_fun
 # ============================
-# OpenAI 클라이언트
+# OpenAI 클라이언트 (services.llm 의 AsyncOpenAI + 동시성 제한)
 # ============================
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from services.admission import admission, user_key_for
+from services.answer_cache import Bucket, answer_cache, profile_bucket
+from services.history import (
+    SUMMARY_MAX_TOKENS,
+    apply_summary,
+    budget_history,
+    needs_compaction,
+    summarize_old_turns,
+)
+from services.llm import (
+    CHAT_MODEL,
+    LLM_ATTEMPT_TIMEOUT,
+    LLM_DEADLINE,
+    LLM_STREAM_DEADLINE,
+    LLMUnavailable,
+    async_client,
+    complete,
+    latency_stats,
+    llm_limiter,
+    usage_stats,
+)
+from services.profile_events import changed_since
+from services.retrieval import build_welfare_index, retrieve_services
+from services.session_store import create_session_store
+from services.welfare_catalog import catalog_cache
 # ※ 하드코딩된 키는 꼭 제거하고, 환경변수만 쓰는 걸 추천!
 
 # ============================
 # FastAPI 라우터
 # ============================
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # ============================
-# 세션 관리 (메모리 기반)
+# 세션 관리 (services.session_store, SESSION_STORE 로 백엔드 선택)
 # ============================
-SESSION_TTL = 300  # 5분
+session_store = create_session_store()
+SESSION_TTL = session_store.ttl  # 기본 5분
 
-SESSIONS: Dict[str, Dict[str, Any]] = {}
-# 구조:
-# {
-#   session_id: {
-#       "messages": [ {role, content}, ... ],
-#       "updated_at": float,
-#   }
-# }
 
-
-def new_session_id() -> str:
-    return str(uuid4())
-
-
-def get_or_create_session(session_id: Optional[str]):
-    now = time.time()
-
-    # 1) 세션 없음 → 새로 생성
-    if not session_id or session_id not in SESSIONS:
-        sid = new_session_id()
-        SESSIONS[sid] = {
-            "messages": [],
-            "updated_at": now,
-        }
-        return sid, SESSIONS[sid]
-
-    session = SESSIONS[session_id]
-
-    # 2) 5분 이상 대화 없음 → 히스토리 초기화
-    if now - session["updated_at"] > SESSION_TTL:
-        SESSIONS[session_id] = {
-            "messages": [],
-            "updated_at": now,
-        }
-        return session_id, SESSIONS[session_id]
-
-    # 3) 정상 세션 → 시간만 갱신
-    session["updated_at"] = now
-    return session_id, session
+async def get_or_create_session(session_id: Optional[str]):
+    """
+    - 세션 없음 → 새로 생성
+    - TTL 이상 대화 없음 → 히스토리 초기화
+    - 정상 세션 → 시간만 갱신
+    """
+    return await session_store.aget_or_create(session_id)
 
 
 # ============================
 # 복지 DB 조회 래퍼
 # ============================
 
-def search_welfare_from_db(email: str):
-    """
-    email로 해당 유저의 location을 찾고,
-    그 location에 해당하는 복지 리스트를 반환.
-    routers.welfare.get_welfare_list를 그대로 재사용.
-    """
-    return get_welfare_list(email)
-
-
 def welfare_rows_to_text(rows) -> str:
     """
     DB에서 가져온 rows(튜플 리스트)를
@@ -114,59 +108,64 @@ def welfare_rows_to_text(rows) -> str:
 
 
 # ============================
-# 엔드포인트 정의 (1-call GPT)
+# 프롬프트 구성
 # ============================
 
-@router.post("/chat", response_model=ChatResponse)
-def chat(body: ChatRequest):
+PERSONA_PROMPT = (
+    "너는 한국 사용자를 돕는 복지 안내 챗봇이야. "
+    "항상 한국어로 친절하고 이해하기 쉽게 답변해."
+)
+
+
+WELFARE_TOP_K = env_int("WELFARE_TOP_K", 8)
+
+WELFARE_CONTEXT_HEADER = (
+    "다음은 사용자의 거주 지역(location)에 기반하여 조회된 복지 정보 중 "
+    "이번 질문과 관련도가 높은 항목입니다.\n"
+    "이 정보를 적극적으로 참고해서 사용자의 질문에 맞는 복지 정보를 골라 설명하세요.\n\n"
+)
+
+
+async def load_session_context(email: str, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
-    메인 챗봇 엔드포인트 (1-call 버전).
-    - session_id 없으면 새로 생성
-    - 기존 세션이면 5분 TTL 체크 후 유지/초기화
-    - email을 이용해 DB에서 복지 리스트를 한 번 조회하고,
-      그 결과를 system 컨텍스트로 넣은 뒤 GPT를 1번만 호출
+    세션 동안 바뀌지 않는 컨텍스트(사용자 정보 + 지역)를 한 번에 만든다.
+    - profile(토큰의 프로필 클레임)이 있으면 userinform 조회 없이 그 지역 카탈로그만
+    - 없으면 복지 카탈로그 / 사용자 정보 조회(동기 psycopg2)를 llm lane 스레드에서 동시에 실행
+      (챗봇 턴이 몰려도 CRUD 라우트의 db lane 은 비어 있도록).
     """
-    # 1) 세션 처리
-    session_id, session = get_or_create_session(body.session_id)
-
-    # 2) email 기반 복지 데이터 조회
-    welfare_rows = []
-    welfare_context_text = "사용자의 이메일이 없어서 지역 복지 정보를 조회할 수 없습니다. 일반적인 복지 안내만 제공하세요."
-    if body.email:
+    if profile is not None:
+        info_result: Any = {"user": profile}
         try:
-            welfare_rows = search_welfare_from_db(body.email)
-            welfare_context_text = (
-                "다음은 사용자의 거주 지역(location)에 기반하여 조회된 복지 정보 목록입니다.\n"
-                "이 정보를 적극적으로 참고해서 사용자의 질문에 맞는 복지 정보를 골라 설명하세요.\n\n"
-                f"{welfare_rows_to_text(welfare_rows)}"
-            )
+            catalog_result: Any = await run_in_lane("llm", catalog_cache.get, profile.get("location") or "")
         except Exception as e:
-            # DB 오류가 나도 챗봇은 동작하게
+            catalog_result = e
+    else:
+        catalog_result, info_result = await asyncio.gather(
+            run_in_lane("llm", get_welfare_catalog, email),
+            run_in_lane("llm", get_inform_fun, email),
+            return_exceptions=True,
+        )
+    if isinstance(info_result, BaseException):
+        raise info_result
+
+    # email 기반 복지 데이터 조회
+    complete_ = True
+    sigun_name = None
+    welfare_context_text = "사용자의 이메일이 없어서 지역 복지 정보를 조회할 수 없습니다. 일반적인 복지 안내만 제공하세요."
+    if email:
+        if isinstance(catalog_result, BaseException):
+            # DB 오류가 나도 챗봇은 동작하게 (다음 턴에 다시 시도)
+            complete_ = False
             welfare_context_text = (
-                f"지역 복지 정보를 조회하는 중 오류가 발생했습니다({e}). "
+                f"지역 복지 정보를 조회하는 중 오류가 발생했습니다({catalog_result}). "
                 "대신 한국의 일반적인 복지 제도에 대해 안내하세요."
             )
+        else:
+            # 실제 복지 목록은 턴마다 질문 기준으로 검색 (welfare_context_for)
+            sigun_name = catalog_result.sigun_name
+            welfare_context_text = None
 
-    # 3) GPT에 보낼 메시지 구성 (한 번만 호출)
-    messages: List[Dict[str, str]] = []
-
-    # 기존 대화 히스토리
-    messages.extend(session["messages"])
-
-    # 시스템 역할: 봇 성격 + 복지 데이터 컨텍스트
-    messages.append({
-        "role": "system",
-        "content": (
-            "너는 한국 사용자를 돕는 복지 안내 챗봇이야. "
-            "항상 한국어로 친절하고 이해하기 쉽게 답변해."
-        ),
-    })
-    messages.append({
-        "role": "system",
-        "content": welfare_context_text,
-    })
-    info = get_inform_fun(body.email)['user']
-
+    info = info_result['user']
     user_profile_text = (
         f"사용자 기본 정보:\n"
         f"- 이메일: {info['email']}\n"
@@ -174,26 +173,543 @@ def chat(body: ChatRequest):
         f"- 나이: {info['age']}\n"
         f"- 성별: {info['sex']}\n"
     )
+    return {
+        "email": email,
+        "profile": info,
+        "sigun_name": sigun_name,
+        "welfare_text": welfare_context_text,
+        "profile_text": user_profile_text,
+        "captured_at": time.time(),
+        "complete": complete_,
+    }
+
+
+async def get_session_context(
+    session: Dict[str, Any],
+    email: str,
+    profile: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    세션에 저장된 컨텍스트 스냅샷을 재사용 (후속 턴은 DB 조회 없음).
+    다른 email 이거나, 지난번 조회가 실패했거나, 그 사이 프로필이 바뀌었으면
+    (또는 토큰의 프로필 클레임이 스냅샷과 다르면) 새로 만든다.
+    """
+    ctx = session.get("context")
+    if (
+        ctx is None
+        or ctx.get("email") != email
+        or not ctx.get("complete")
+        or changed_since(email, ctx["captured_at"])
+        or (profile is not None and ctx.get("profile") != profile)
+    ):
+        ctx = await load_session_context(email, profile)
+        session["context"] = ctx
+    return ctx
+
+
+async def region_catalog(ctx: Dict[str, Any]):
+    """세션 지역의 카탈로그. 보통 메모리 캐시에 있으므로 DB 를 타지 않는다."""
+    sigun_name = ctx["sigun_name"]
+    return catalog_cache.peek(sigun_name) or await run_in_lane("llm", catalog_cache.get, sigun_name)
+
+
+async def related_services(ctx: Dict[str, Any], question: str, k: int = WELFARE_TOP_K) -> List[Dict[str, Any]]:
+    """지역 카탈로그의 BM25 인덱스에서 질문 + 프로필과 맞는 상위 k 개."""
+    catalog = await region_catalog(ctx)
+    # 색인 생성은 카탈로그 스냅샷당 한 번, 이벤트 루프 밖에서
+    index = catalog.derived("bm25") or await run_in_lane("llm", catalog.derive, "bm25", build_welfare_index)
+    return retrieve_services(index, question, ctx.get("profile"), k)
+
+
+# 지역 서비스 목록 (프롬프트 prefix 용). 0 이면 넣지 않는다
+REGION_DIGEST_MAX_ITEMS = env_int("REGION_DIGEST_MAX_ITEMS", 300)
+
+
+def region_digest_text(sigun_name: str, rows: List[Dict[str, Any]]) -> str:
+    """지역의 복지 서비스 목록 (서비스명 · 담당 부서). 카탈로그 정렬 순서라 스냅샷이 같으면 바이트 단위로 같다."""
+    lines = [
+        f"- {row['service_name']} · {row['department'] or '담당 부서 정보 없음'}"
+        for row in rows[:REGION_DIGEST_MAX_ITEMS]
+    ]
+    if not lines:
+        return f"{sigun_name} 지역에 등록된 복지 서비스가 없습니다."
+    return (
+        f"다음은 {sigun_name} 지역의 복지 서비스 목록입니다 (서비스명 · 담당 부서). "
+        "자세한 대상 / 신청 방법은 뒤에 주어지는 검색 결과를 참고하세요.\n"
+        + "\n".join(lines)
+    )
+
+
+async def region_digest_for(ctx: Dict[str, Any]) -> Optional[str]:
+    """같은 지역 사용자 모두에게 같은 prefix 블록 (카탈로그 스냅샷당 한 번 만든다)."""
+    sigun_name = ctx.get("sigun_name")
+    if sigun_name is None or REGION_DIGEST_MAX_ITEMS <= 0:
+        return None
+    catalog = await region_catalog(ctx)
+    return catalog.derive("digest", lambda rows: region_digest_text(sigun_name, rows))
+
+
+async def welfare_context_for(ctx: Dict[str, Any], question: str) -> str:
+    """이번 질문과 관련된 지역 복지 목록을 프롬프트용 텍스트로."""
+    if ctx.get("sigun_name") is None:
+        return ctx["welfare_text"]
+    rows = await related_services(ctx, question)
+    return WELFARE_CONTEXT_HEADER + welfare_rows_to_text(rows)
+
+
+FALLBACK_TOP_K = env_int("FALLBACK_TOP_K", 5)
+
+FALLBACK_NOTICE = (
+    "지금은 답변 생성이 지연되고 있어서, 질문과 관련된 지역 복지 정보를 먼저 안내해 드릴게요. "
+    "자세한 설명이 필요하면 잠시 후 다시 질문해 주세요.\n\n"
+)
+
+FALLBACK_GENERIC = (
+    "지금은 답변 생성이 지연되고 있어요. 잠시 후 다시 질문해 주세요. "
+    "급하신 경우 복지로(https://www.bokjiro.go.kr) 또는 보건복지상담센터(129)에서도 안내받을 수 있어요."
+)
+
+
+async def fallback_reply(ctx: Dict[str, Any], question: str) -> str:
+    """
+    LLM 이 마감 안에 답하지 못했을 때 쓰는 대체 답변.
+    LLM 없이 BM25 검색 결과만으로 만들기 때문에 항상 바로 돌아온다.
+    """
+    if ctx.get("sigun_name") is None:
+        return FALLBACK_GENERIC
+    try:
+        rows = await related_services(ctx, question, FALLBACK_TOP_K)
+    except Exception as e:
+        logger.warning("fallback welfare lookup failed: %s", e)
+        return FALLBACK_GENERIC
+    return FALLBACK_NOTICE + welfare_rows_to_text(rows)
+
+
+async def build_messages(session: Dict[str, Any], body: ChatRequest, ctx: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    세션 히스토리 + 복지 컨텍스트 + 사용자 정보 + 질문으로 GPT 메시지 구성.
+    """
+    welfare_text = await welfare_context_for(ctx, body.message)
+    region_digest = await region_digest_for(ctx)
+
+    # 순서 주의: provider 프롬프트 캐시는 "앞부분이 바이트 단위로 같은" 요청끼리만 적중하고,
+    # 그 앞부분이 1024 토큰 이상이어야 한다.
+    # 고정인 페르소나 → 지역 서비스 목록(같은 지역 사용자 / 모든 턴에 같음) → 사용자 정보
+    # (첫 턴의 버킷 프로필과 이후 턴의 프로필이 달라도 앞 두 블록은 그대로) →
+    # (append 만 되는) 히스토리 순으로 prefix 를 만들고
+    # 질문마다 달라지는 검색 결과와 질문은 맨 뒤에 붙인다.
+    messages: List[Dict[str, str]] = [{"role": "system", "content": PERSONA_PROMPT}]
+    if region_digest:
+        messages.append({"role": "system", "content": region_digest})
+    messages.append({"role": "system", "content": ctx["profile_text"]})
+
+    # 오래된 대화는 요약으로 (_compact_session 이 채움)
+    if session.get("summary"):
+        messages.append({
+            "role": "system",
+            "content": f"이전 대화 요약:\n{session['summary']}",
+        })
+
+    # 기존 대화 히스토리 (요약 전이라도 토큰 예산 안의 최근 메시지만)
+    messages.extend(budget_history(session["messages"]))
+
+    # 이번 질문 기준 복지 검색 결과
     messages.append({
         "role": "system",
-        "content": user_profile_text,
-    },)
+        "content": welfare_text,
+    })
 
     # 유저의 최신 질문
     messages.append({
         "role": "user",
         "content": body.message,
     })
+    return messages
 
-    # 4) GPT 한 번 호출
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",  # 비용 아끼려면 gpt-4o-mini 추천
-        messages=messages,
-    )
-    reply = completion.choices[0].message.content or ""
 
-    # 5) 세션 히스토리에 저장
-    session["messages"].append({"role": "user", "content": body.message})
+async def save_turn(session_id: str, session: Dict[str, Any], user_message: str, reply: str) -> None:
+    session["messages"].append({"role": "user", "content": user_message})
     session["messages"].append({"role": "assistant", "content": reply})
+    # 세션당 메시지 수 / 바이트 상한 적용 후 저장
+    await session_store.acommit(session_id, session)
+
+    # 토큰 예산을 넘었으면 응답은 먼저 보내고 요약은 뒤에서
+    if needs_compaction(session) and session_id not in _compacting:
+        _compacting.add(session_id)
+        task = asyncio.create_task(_compact_session(session_id, session))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+_compacting: set = set()
+_background: set = set()
 
-    return ChatResponse(session_id=session_id, reply=reply)
+
+async def _summarize(prompt: List[Dict[str, str]]) -> str:
+    completion = await complete(prompt, purpose="summary", max_tokens=SUMMARY_MAX_TOKENS)
+    return completion.choices[0].message.content or ""
+
+
+async def _compact_session(session_id: str, session: Dict[str, Any]) -> None:
+    try:
+        # 요약(LLM 호출)은 락 밖에서, 적용만 턴 사이에 끼워 넣는다
+        result = await summarize_old_turns(session, _summarize)
+        if result is None:
+            return
+        async with session_locks.hold(session_id):
+            # 그 사이 다른 턴이 저장됐을 수 있으니 저장소의 최신 사본에 적용
+            current = await session_store.aload(session_id)
+            if current is not None and apply_summary(current, *result):
+                await session_store.acommit(session_id, current)
+    except Exception as e:
+        logger.warning("history compaction for %s failed: %s", session_id, e)
+    finally:
+        _compacting.discard(session_id)
+
+
+# ============================
+# 중복 요청 합치기 / 세션별 턴 직렬화
+# ============================
+# 같은 (session_id, 질문) 이 동시에 오면 LLM 호출 하나를 같이 기다리고,
+# 한 세션의 턴은 하나씩만 진행해서 히스토리가 섞이지 않게 한다.
+chat_flights = SingleFlight()
+session_locks = KeyedLocks()
+
+# 방금 끝난 턴을 잠깐 기억 → 락을 기다렸다 들어온 중복 전송은 다시 호출하지 않고 같은 답을 돌려줌
+CHAT_DEDUPE_WINDOW = env_float("CHAT_DEDUPE_WINDOW", 10.0)
+recent_turns: TTLCache[Dict[str, Any]] = TTLCache(maxsize=10_000, ttl=CHAT_DEDUPE_WINDOW)
+
+
+# 진행 중인 스트리밍 턴 (key → 개수). 응답 generator 가 시작되지 않고 버려져도 마감 뒤에는 사라진다
+streaming_turns: TTLCache[int] = TTLCache(maxsize=10_000, ttl=LLM_STREAM_DEADLINE + CHAT_DEDUPE_WINDOW)
+
+
+def turn_key(session_id: str, body: ChatRequest) -> Tuple[str, str]:
+    digest = hashlib.sha256(f"{body.email}\0{body.message}".encode("utf-8")).hexdigest()
+    return session_id, digest
+
+
+def is_duplicate_turn(body: ChatRequest) -> bool:
+    """진행 중이거나 방금 끝난 같은 턴 (합쳐지거나 replay 되므로 LLM 을 다시 부르지 않음)."""
+    if not body.session_id:
+        return False
+    key = turn_key(body.session_id, body)
+    return (
+        chat_flights.inflight(key)
+        or streaming_turns.peek(key) is not None
+        or recent_turns.peek(key) is not None
+    )
+
+
+def admit_turn(body: ChatRequest, request: Request) -> None:
+    """입장 제어. 중복 전송은 한도에서 다시 차감하지 않는다 (같은 LLM 호출 하나를 같이 쓰므로)."""
+    if is_duplicate_turn(body):
+        return
+    admission.admit(user_key_for(body.email, request.client.host if request.client else None), body.message)
+
+
+# ============================
+# 답변 캐시
+# ============================
+# 지역 카탈로그가 바뀌면 그 지역 답변은 버림
+catalog_cache.subscribe(answer_cache.invalidate_region)
+
+
+def answer_cache_bucket(session: Dict[str, Any], ctx: Dict[str, Any]) -> Optional[Bucket]:
+    """
+    히스토리 없는 첫 질문 + 지역 정보가 있을 때만 캐시 대상.
+    (후속 질문은 앞 대화에 따라 답이 달라지므로 제외)
+    """
+    if session["messages"] or session.get("summary") or not ctx.get("sigun_name"):
+        return None
+    return profile_bucket(ctx["sigun_name"], ctx.get("profile"))
+
+
+AGE_GROUP_LABELS = {
+    "senior": "65세 이상",
+    "adult": "40~64세",
+    "youth": "19~39세",
+    "child": "18세 이하",
+}
+
+
+def bucket_context(ctx: Dict[str, Any], bucket: Bucket) -> Dict[str, Any]:
+    """
+    답변 캐시 대상 턴에 쓰는 컨텍스트: 이메일 / 정확한 나이 대신 버킷 값만.
+    같은 버킷의 다른 사용자에게 그대로 나가는 답변이므로 개인 정보가 프롬프트에 들어가면 안 된다.
+    """
+    sigun_name, group, sex = bucket
+    profile_text = (
+        f"사용자 기본 정보:\n"
+        f"- 지역: {sigun_name}\n"
+        f"- 연령대: {AGE_GROUP_LABELS.get(group, '정보 없음')}\n"
+        f"- 성별: {sex if sex != 'unknown' else '정보 없음'}\n"
+    )
+    return {
+        **ctx,
+        "profile": {"location": sigun_name, "age_group": group, "sex": sex},
+        "profile_text": profile_text,
+    }
+
+
+# ============================
+# 엔드포인트 정의 (1-call GPT)
+# ============================
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    body: ChatRequest,
+    request: Request,
+    principal: Optional[Principal] = Depends(optional_principal),
+):
+    """
+    메인 챗봇 엔드포인트 (1-call 버전).
+    - session_id 없으면 새로 생성
+    - 기존 세션이면 5분 TTL 체크 후 유지/초기화
+    - email을 이용해 DB에서 복지 리스트를 한 번 조회하고,
+      그 결과를 system 컨텍스트로 넣은 뒤 GPT를 1번만 호출
+    - 같은 세션에 같은 질문이 동시에 오면 (더블 탭 / 재전송) 한 번만 처리해서 같은 응답을 돌려줌
+    - 사용자별 / 전체 한도를 넘으면 429, LLM 대기열이 밀려 있으면 503 (services.admission)
+      합쳐지는 중복 전송은 한도에서 한 번만 차감
+    """
+    body = body.model_copy(update={"email": resolve_email(body.email, principal)})
+    profile = principal_profile(principal)
+    admit_turn(body, request)
+    if not body.session_id:
+        return await _chat_turn(body, profile)
+    return await chat_flights.do(turn_key(body.session_id, body), lambda: _chat_turn(body, profile))
+
+
+async def _chat_turn(body: ChatRequest, profile: Optional[Dict[str, Any]] = None) -> ChatResponse:
+    async with session_locks.hold(body.session_id):
+        # 1) 세션 처리
+        session_id, session = await get_or_create_session(body.session_id)
+        key = turn_key(session_id, body)
+
+        # 앞 요청이 방금 같은 질문을 처리했으면 그대로 재사용 (히스토리에 두 번 쓰지 않음)
+        replay = recent_turns.get(key)
+        if replay is not None:
+            return ChatResponse(session_id=session_id, **replay)
+
+        # 2) 같은 지역/프로필 버킷에서 이미 답한 질문이면 바로 반환
+        ctx = await get_session_context(session, body.email, profile)
+        bucket = answer_cache_bucket(session, ctx)
+        cached = answer_cache.get(bucket, body.message) if bucket else None
+        if cached is not None:
+            await save_turn(session_id, session, body.message, cached)
+            recent_turns.set(key, {"reply": cached, "degraded": False})
+            return ChatResponse(session_id=session_id, reply=cached)
+
+        # 3) 복지 데이터 조회 + GPT에 보낼 메시지 구성 (한 번만 호출)
+        #    캐시해서 같은 버킷 사용자에게 재사용할 답변은 버킷 프로필로만 만든다
+        messages = await build_messages(session, body, bucket_context(ctx, bucket) if bucket else ctx)
+
+        # 4) GPT 한 번 호출 (마감 초과 / 장애 시 로컬 대체 답변, 대체 답변은 캐시하지 않음)
+        try:
+            completion = await complete(messages)
+            reply = completion.choices[0].message.content or ""
+            degraded = False
+        except LLMUnavailable as e:
+            logger.warning("chat %s: LLM unavailable, serving fallback: %s", session_id, e)
+            reply = await fallback_reply(ctx, body.message)
+            degraded = True
+        if bucket and reply and not degraded:
+            answer_cache.set(bucket, body.message, reply)
+
+        # 5) 세션 히스토리에 저장
+        await save_turn(session_id, session, body.message, reply)
+        recent_turns.set(key, {"reply": reply, "degraded": degraded})
+
+        return ChatResponse(session_id=session_id, reply=reply, degraded=degraded)
+
+
+# ============================
+# 스트리밍 (SSE)
+# ============================
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    body: ChatRequest,
+    request: Request,
+    principal: Optional[Principal] = Depends(optional_principal),
+):
+    """
+    /chat 과 같은 입력을 받아 답변을 토큰 단위 SSE 로 흘려보낸다.
+
+    event: session → {"session_id"}        (첫 이벤트)
+    data           → {"delta": "..."}      (토큰 조각)
+    event: done    → {"session_id", "reply", "degraded"}
+    event: error   → {"detail"}
+
+    첫 토큰 전에 LLM 이 실패/지연되면 로컬 대체 답변을 한 번에 보낸다 (degraded=true).
+    슬롯 대기부터 마지막 토큰까지 LLM_STREAM_DEADLINE 초를 넘기면, 보낸 토큰이 없으면 대체 답변,
+    있으면 error 이벤트로 끝낸다.
+    클라이언트가 끊으면 upstream 스트림도 닫고, 히스토리에는 저장하지 않는다.
+    같은 세션의 턴은 /chat 과 같은 락으로 직렬화되고, 방금 끝난 같은 질문은 다시 호출하지 않는다.
+    입장 제어(429 / 503)는 스트림을 열기 전에 일반 HTTP 응답으로 돌려준다 (중복 전송은 차감하지 않음).
+    """
+    body = body.model_copy(update={"email": resolve_email(body.email, principal)})
+    profile = principal_profile(principal)
+    admit_turn(body, request)
+    key = turn_key(body.session_id, body) if body.session_id else None
+    if key is not None:
+        streaming_turns.set(key, streaming_turns.peek(key, 0) + 1)
+
+    async def event_stream():
+        try:
+            async with session_locks.hold(body.session_id):
+                async for event in _stream_turn(body, request, profile):
+                    yield event
+        finally:
+            if key is not None:
+                left = streaming_turns.peek(key, 0) - 1
+                if left > 0:
+                    streaming_turns.set(key, left)
+                else:
+                    streaming_turns.pop(key)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_turn(body: ChatRequest, request: Request, profile: Optional[Dict[str, Any]] = None):
+    try:
+        session_id, session = await get_or_create_session(body.session_id)
+        key = turn_key(session_id, body)
+        replay = recent_turns.get(key)
+        if replay is None:
+            ctx = await get_session_context(session, body.email, profile)
+            bucket = answer_cache_bucket(session, ctx)
+            cached = answer_cache.get(bucket, body.message) if bucket else None
+            if cached is None:
+                # 캐시해서 같은 버킷 사용자에게 재사용할 답변은 버킷 프로필로만 만든다
+                messages = await build_messages(session, body, bucket_context(ctx, bucket) if bucket else ctx)
+            else:
+                messages = []
+    except Exception as e:
+        logger.error("chat stream setup failed: %s", e, exc_info=True)
+        yield sse_event({"detail": "답변 준비 중 오류가 발생했습니다."}, event="error")
+        return
+
+    yield sse_event({"session_id": session_id}, event="session")
+
+    if replay is not None:
+        # 중복 전송: 직전 턴의 답을 그대로
+        yield sse_event({"delta": replay["reply"]})
+        yield sse_event({"session_id": session_id, **replay}, event="done")
+        return
+
+    if cached is not None:
+        # 캐시 적중: 한 번에 흘려보내고 히스토리에만 기록
+        yield sse_event({"delta": cached})
+        await save_turn(session_id, session, body.message, cached)
+        recent_turns.set(key, {"reply": cached, "degraded": False})
+        yield sse_event({"session_id": session_id, "reply": cached, "degraded": False}, event="done")
+        return
+
+    parts: List[str] = []
+    stream = None
+    started = time.monotonic()
+    # 답변 전체(슬롯 대기 ~ 마지막 토큰)의 상한
+    stream_ends_at = started + LLM_STREAM_DEADLINE
+    try:
+        # 스트림이 끝날 때까지 LLM 동시성 슬롯을 점유.
+        # 슬롯 대기 + 스트림 생성을 합쳐서 마감 안에 (넘으면 대체 답변)
+        stream_open_by = min(started + min(LLM_DEADLINE, LLM_ATTEMPT_TIMEOUT), stream_ends_at)
+        async with llm_limiter.slot(timeout=stream_open_by - time.monotonic()):
+            stream = await asyncio.wait_for(
+                async_client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                max(0.0, stream_open_by - time.monotonic()),
+            )
+            chunks = stream.__aiter__()
+            while True:
+                # yield 를 감싸는 asyncio.timeout 은 소비하는 쪽 task 를 취소하므로 chunk 마다 남은 시간으로 기다린다
+                remaining = stream_ends_at - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"stream deadline of {LLM_STREAM_DEADLINE:.1f}s exceeded")
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                if await request.is_disconnected():
+                    logger.info("chat stream %s: client disconnected", session_id)
+                    return
+                if getattr(chunk, "usage", None) is not None:
+                    # include_usage: 마지막 chunk 에만 usage 가 실린다
+                    usage_stats.record(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield sse_event({"delta": delta})
+    except asyncio.CancelledError:
+        logger.info("chat stream %s cancelled", session_id)
+        raise
+    except Exception as e:
+        timed_out = isinstance(e, asyncio.TimeoutError)
+        if timed_out:
+            latency_stats.record_deadline_miss()
+        else:
+            latency_stats.record_failure()
+        if parts:
+            # 이미 일부를 보냈으면 대체 답변으로 덮지 않고 오류로 끝냄
+            if timed_out:
+                logger.warning("chat stream %s: deadline exceeded after %d chunks", session_id, len(parts))
+                yield sse_event({"detail": "답변 생성 시간이 초과되었습니다."}, event="error")
+            else:
+                logger.error("chat stream %s failed: %s", session_id, e, exc_info=True)
+                yield sse_event({"detail": "답변 생성 중 오류가 발생했습니다."}, event="error")
+            return
+        logger.warning("chat stream %s: LLM unavailable, serving fallback: %r", session_id, e)
+        degraded = True
+    else:
+        degraded = False
+    finally:
+        if stream is not None:
+            # 끊긴 경우 upstream HTTP 응답도 바로 닫아서 토큰 생성 중단
+            await stream.close()
+
+    if degraded:
+        reply = await fallback_reply(ctx, body.message)
+        yield sse_event({"delta": reply})
+    else:
+        reply = "".join(parts)
+        if bucket and reply:
+            answer_cache.set(bucket, body.message, reply)
+    await save_turn(session_id, session, body.message, reply)
+    recent_turns.set(key, {"reply": reply, "degraded": degraded})
+    yield sse_event({"session_id": session_id, "reply": reply, "degraded": degraded}, event="done")
+
+
+@router.get("/metrics")
+def chatbot_metrics():
+    """LLM 동시 호출 현황 (active / waiting)."""
+    return {
+        "llm": llm_limiter.stats(),
+        "admission": admission.stats(),
+        "usage": usage_stats.stats(),
+        "latency": latency_stats.stats(),
+        "answer_cache": answer_cache.stats(),
+        "dedupe": {
+            **chat_flights.stats(),
+            **session_locks.stats(),
+            "recent_turns": len(recent_turns),
+            "streaming_turns": len(streaming_turns),
+        },
+        "sessions": session_store.stats(),
+    }
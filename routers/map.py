@@ -1,39 +1,39 @@
 # routes/gyeonggi.py
-import os
-import httpx
-
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from schemas.map import Facility, FacilityResponse
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from schemas.auth import Principal
+from schemas.map import (
+    FacilityListResponse,
+    FacilityResponse,
+    NearbyFacility,
+    NearbyFacilityResponse,
+)
+
+from core.auth import optional_principal, principal_profile, resolve_email
+from core.config import env_float, env_int
+from core.db import run_db
+from core.deps import require_admin
+from services.facility_cluster import CLUSTER_MAX_ZOOM, cluster_cache, in_bbox
+from services.facility_store import facility_store
+from services.gyeonggi_api import SIGUNGU_NAMES, facility_client
+from services.profile_repo import profile_repo
 
-DB_DSN = os.getenv("DATABASE_URL")
 router = APIRouter()
 
-def get_db_connection():
-    conn = psycopg2.connect(DB_DSN
-                            ,cursor_factory=RealDictCursor)
-    return conn
+NEAR_DEFAULT_RADIUS_M = env_float("FACILITY_NEAR_DEFAULT_RADIUS_M", 50_000.0)
+NEAR_MAX_RADIUS_M = env_float("FACILITY_NEAR_MAX_RADIUS_M", 200_000.0)
+# regions 로 한 번에 더 조회할 수 있는 인접 시군 수 (시군마다 upstream 조회가 따로 나간다)
+MAX_EXTRA_REGIONS = env_int("FACILITY_MAX_EXTRA_REGIONS", 4)
+
 def get_user_location_by_email(email: str) -> str | None:
     """
     userinform 테이블에서 email이 같은 행의 location 컬럼을 반환.
-    없으면 None.
+    없으면 None. (services.profile_repo 캐시를 거친다)
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT location FROM userinform WHERE email = %s LIMIT 1",
-                (email,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            return row["location"]  # RealDictCursor라 키로 접근 가능
-    finally:
-        conn.close()
+    profile = profile_repo.get(email)
+    if not profile:
+        return None
+    return profile["location"]
 
 
 # =======================
@@ -41,66 +41,139 @@ def get_user_location_by_email(email: str) -> str | None:
 # =======================
 
 @router.get("/facilities", response_model=FacilityResponse)
-async def get_gyeonggi_facilities(email: str):
+async def get_gyeonggi_facilities(
+    email: Optional[str] = None,
+    principal: Optional[Principal] = Depends(optional_principal),
+    regions: Optional[List[str]] = Query(None, description="함께 조회할 인접 시군 (SIGUNGU_NM, 반복 지정)"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="지도 zoom 레벨 (없으면 전체 시설)"),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+):
     """
     유저 email만 받고, 경기도 공공데이터 API에서 시설 목록을 조회.
-    """
+    (지역별 응답은 facility_client 가 캐싱)
 
-    API_URL = "https://openapi.gg.go.kr/HtygdWelfaclt"  # 실제 API 종류에 맞게 수정
-
-    API_KEY = os.getenv("GYEONGGI_OPENAPI_KEY")
-    SIGUN_NM = get_user_location_by_email(email)
+    - zoom < FACILITY_CLUSTER_MAX_ZOOM 이면 data 는 비우고 clusters 로 응답
+    - min/max lat/lng 를 모두 주면 그 화면 영역 안의 것만 반환
+    - regions 로 인접 시군을 추가하면 합쳐서 (중복 제거 후) 반환
+      (경기도 시군명만, 최대 FACILITY_MAX_EXTRA_REGIONS 개. 아니면 400)
+    - 사용자 지역(location)이 없으면 upstream 을 부르지 않고 404
+    """
+    extra_regions = sorted(set(regions or ()))
+    unknown = [r for r in extra_regions if r not in SIGUNGU_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 시군: {', '.join(unknown)}")
+    if len(extra_regions) > MAX_EXTRA_REGIONS:
+        raise HTTPException(status_code=400, detail=f"regions 는 최대 {MAX_EXTRA_REGIONS}개까지 지정할 수 있습니다.")
+
+    viewport = (min_lat, min_lng, max_lat, max_lng)
+    if all(v is None for v in viewport):
+        bbox = None
+    elif any(v is None for v in viewport):
+        raise HTTPException(status_code=400, detail="viewport 는 min_lat/min_lng/max_lat/max_lng 를 모두 지정해야 합니다.")
+    else:
+        bbox = viewport
+
+    # 토큰에 프로필 클레임이 있으면 DB 조회 없이, 아니면
+    # 동기 psycopg2 조회는 이벤트 루프를 막지 않도록 스레드로
+    email = resolve_email(email, principal)
+    profile = principal_profile(principal)
+    if profile is not None:
+        SIGUN_NM = profile["location"]
+    else:
+        SIGUN_NM = await run_db(get_user_location_by_email, email)
+    if not SIGUN_NM:
+        # 지역 없이 조회하면 upstream 전체 페이지를 받게 되므로 여기서 끊는다
+        raise HTTPException(status_code=404, detail="사용자 지역 정보가 없습니다.")
+
+    if extra_regions:
+        region_names = sorted({SIGUN_NM, *extra_regions})
+        facilities = await facility_client.get_facilities_multi(region_names)
+        region_key = "+".join(region_names)
+    else:
+        facilities = await facility_client.get_facilities(SIGUN_NM)
+        region_key = SIGUN_NM
+
+    if zoom is not None and zoom < CLUSTER_MAX_ZOOM:
+        clusters = cluster_cache.get(region_key, facilities, zoom)
+        return FacilityResponse(
+            code=200,
+            message="SUCCESS",
+            data=[],
+            user_location = SIGUN_NM,
+            zoom=zoom,
+            clusters=[c for c in clusters if in_bbox(c.lat, c.lng, bbox)],
+        )
 
-    params = {
-        "Key": API_KEY,
-        "Type": "json",  # <-- JSON을 직접 받음
-        "pIndex": 1,
-        "pSize": 1000,
-        "SIGUNGU_NM" : SIGUN_NM
-    }
+    if bbox is not None:
+        facilities = [f for f in facilities if in_bbox(f.lat, f.lng, bbox)]
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(API_URL, params=params)
+    return FacilityResponse(
+        code=200,
+        message="SUCCESS",
+        data=facilities,
+        user_location = SIGUN_NM,
+        zoom=zoom,
+    )
 
-    if resp.status_code != 200:
-        raise HTTPException(
-            status_code=resp.status_code,
-            detail="Failed to fetch Gyeonggi API"
-        )
 
-    json_data = resp.json()
+@router.get("/cache/stats")
+def facility_cache_stats():
+    return {**facility_client.stats(), "clusters": cluster_cache.stats()}
 
-    # JSON 구조에 따라 row 목록 추출
-    child  = json_data.get("HtygdWelfaclt", [])
-    rows = next(
-        (v.get("row", []) for v in child if isinstance(v, dict) and "row" in v),
-        []
-    )
 
-    facilities = []
-    for row in rows:
-        try:
-            lat = float(row.get("REFINE_WGS84_LAT"))
-            lng = float(row.get("REFINE_WGS84_LOGT"))
-        except:
-            continue
-
-        facilities.append(
-            Facility(
-                name=row.get("FACLT_NM"),
-                phone=row.get("DETAIL_TELNO"),
-                lot_addr=row.get("REFINE_LOTNO_ADDR"),
-                road_addr=row.get("REFINE_ROADNM_ADDR"),
-                lo_addr = row.get("HMPG_URL","wwww."),
-                lat=lat,
-                lng=lng,
-            )
-        )
+def _require_store():
+    if not len(facility_store):
+        raise HTTPException(status_code=503, detail="facility store is empty; sync required")
 
 
-    return FacilityResponse(
+@router.get("/facilities/near", response_model=NearbyFacilityResponse, dependencies=[Depends(_require_store)])
+def get_nearby_facilities(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(20, ge=1, le=200),
+    radius_m: float = Query(NEAR_DEFAULT_RADIUS_M, gt=0, le=NEAR_MAX_RADIUS_M, description="이 거리(m) 밖의 시설은 제외"),
+):
+    """
+    GPS 좌표 기준 가까운 시설 k개 (로컬 인덱스, upstream 호출 없음).
+    반경은 유한값만 받는다 (멀리 떨어진 좌표가 인덱스 전체를 훑지 않도록).
+    """
+    found = facility_store.nearest(lat, lng, k, radius_m)
+    data = [
+        NearbyFacility(**item.facility.model_dump(), distance_m=round(dist, 1))
+        for dist, item in found
+    ]
+    return NearbyFacilityResponse(code=200, message="SUCCESS", data=data)
+
+
+@router.get("/facilities/bbox", response_model=FacilityListResponse, dependencies=[Depends(_require_store)])
+def get_facilities_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1000, ge=1, le=5000),
+):
+    """지도 화면 영역(bounding box) 안의 시설."""
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="min 값이 max 값보다 큽니다.")
+    found = facility_store.bbox(min_lat, min_lng, max_lat, max_lng)
+    return FacilityListResponse(
         code=200,
         message="SUCCESS",
-        data=facilities,
-        user_location = SIGUN_NM
+        data=[item.facility for item in found[:limit]],
     )
+
+
+@router.post("/facilities/sync", dependencies=[Depends(require_admin)])
+async def sync_facility_store():
+    """upstream 전체 데이터셋을 다시 받아 로컬 저장소/인덱스를 갱신."""
+    count = await facility_store.sync()
+    return {"success": True, "facilities": count}
+
+
+@router.get("/facilities/store/stats")
+def facility_store_stats():
+    return facility_store.stats()
@@ -1,128 +1,85 @@
-import logging
 from typing import Optional
 
-from fastapi import APIRouter
-import os
-import psycopg2
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from core.auth import issue_token, optional_principal, resolve_email
+from core.cursor import decode_key, encode_key
+from core.lanes import on_lane
+from schemas.auth import Principal
+from schemas.user_inform import FavWelfareBatchBody
+from services.favorites_repo import CURSOR_TYPES, favorite_value, favorites_repo
+from services.profile_events import notify_profile_changed
+from services.profile_repo import profile_repo
 
 router = APIRouter()
-db_url = os.getenv("DATABASE_URL")
 
 
-def get_connection():
-    return psycopg2.connect(
-        db_url
-    )
+@router.post("/post_fav_welfare")
+@on_lane("db")
+def post_fav_welfare(welfare: str, url: str, email: Optional[str] = None, principal: Optional[Principal] = Depends(optional_principal)):
+    email = resolve_email(email, principal)
 
+    # (email, welfare) 행 하나만 INSERT ... ON CONFLICT (이미 있으면 URL 만 갱신)
+    created = favorites_repo.add(email, welfare, url)
 
-@router.post("/post_fav_welfare")
-def post_fav_welfare(email: str, welfare: str, url: str):
-    combined_value = f"{welfare},{url}"
-
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # 1) 이미 email이 있는지 확인
-    cur.execute("SELECT welfare FROM userfavwelfare WHERE email = %s", (email,))
-    result = cur.fetchone()
-
-    if result:
-        # 이미 email 존재 → welfare 배열에 append
-        update_query = """
-            UPDATE userfavwelfare
-            SET welfare = array_append(welfare, %s)
-            WHERE email = %s
-        """
-        cur.execute(update_query, (combined_value, email))
-    else:
-        # email 없음 → 새로운 행 추가 (배열로 첫 값 넣기)
-        insert_query = """
-            INSERT INTO userfavwelfare (email, welfare)
-            VALUES (%s, ARRAY[%s])
-        """
-        cur.execute(insert_query, (email, combined_value))
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    return {"success": True, "message": "Favorites updated successfully"}
+    return {"success": True, "message": "Favorites updated successfully", "created": created}
 
 @router.get("/get_fav_welfare")
-def get_fav_welfare(email: str):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    query = """
-        SELECT welfare 
-        FROM userfavwelfare
-        WHERE email = %s
-    """
-    cur.execute(query, (email,))
-    result = cur.fetchone()
-
-    cur.close()
-    conn.close()
-
-    # email이 없을 경우
-    if not result:
+@on_lane("db")
+def get_fav_welfare(
+    email: Optional[str] = None,
+    principal: Optional[Principal] = Depends(optional_principal),
+    sort: str = Query("recent", pattern="^(recent|name)$", description="recent: 최근 추가순, name: 서비스명순"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="페이지 크기 (없으면 전체)"),
+    after: Optional[str] = Query(None, description="직전 응답의 next_cursor 값"),
+):
+    email = resolve_email(email, principal)
+    try:
+        items, next_key = favorites_repo.page(
+            email,
+            sort=sort,
+            limit=limit,
+            after=decode_key(after, CURSOR_TYPES[sort]) if after else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="잘못된 after 커서입니다.") from exc
+
+    # 관심 복지가 하나도 없을 경우 (예전처럼 행이 없는 것과 같게)
+    if not items and not after:
         return {
             "success": False,
             "message": "User not found",
             "welfare": []
         }
 
-    welfare_list = result[0]  # TEXT[]가 리스트로 그대로 들어감
-
     return {
         "success": True,
         "email": email,
-        "welfare": welfare_list
+        # 예전 "서비스명,URL" 문자열 목록 (기존 클라이언트 호환)
+        "welfare": [favorite_value(item["welfare"], item["url"]) for item in items],
+        "items": items,
+        "next_cursor": encode_key(next_key) if next_key else None,
     }
 @router.post("/rm_fav_welfare")
-def rm_fav_welfare(email: str, welfare: str, url: str):
-    combined_value = f"{welfare},{url}"
-
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # 1) 해당 email 존재 여부 확인
-    cur.execute("SELECT welfare FROM userfavwelfare WHERE email = %s", (email,))
-    result = cur.fetchone()
+@on_lane("db")
+def rm_fav_welfare(
+    welfare: str,
+    url: Optional[str] = Query(None, description="사용하지 않음 (예전 클라이언트 호환). 삭제는 서비스명 기준"),
+    email: Optional[str] = None,
+    principal: Optional[Principal] = Depends(optional_principal),
+):
+    """관심 복지 삭제. (email, 서비스명) 으로 찾으므로 url 은 보내지 않아도 된다."""
+    email = resolve_email(email, principal)
 
-    if not result:
-        cur.close()
-        conn.close()
-        return {"success": False, "message": "User not found"}
+    # (email, welfare) 행 하나만 삭제 + 남은 개수 (CTE 한 문장)
+    result = favorites_repo.remove(email, welfare)
 
-    # 2) welfare 배열에서 값 제거 + 제거 후 배열 상태 반환
-    update_query = """
-        UPDATE userfavwelfare
-        SET welfare = array_remove(welfare, %s)
-        WHERE email = %s
-        RETURNING welfare;
-    """
-    cur.execute(update_query, (combined_value, email))
-    updated = cur.fetchone()
-
-    # 혹시 모를 안전 처리
-    if not updated:
-        cur.close()
-        conn.close()
-        return {
-            "success": False,
-            "message": "Update failed (no row updated)"
-        }
-
-    updated_welfare = updated[0]  # TEXT[] → 파이썬 리스트로 들어옴 (또는 None)
+    if not result["removed"]:
+        return {"success": False, "message": "Favorite not found"}
+    # 응답의 removed 는 실제로 지워진 "서비스명,URL"
+    combined_value = favorite_value(welfare, result["url"])
 
-    # 3) 배열이 완전히 비면 row 삭제
-    if not updated_welfare:  # None 이거나 빈 리스트인 경우 둘 다 포함
-        delete_query = "DELETE FROM userfavwelfare WHERE email = %s"
-        cur.execute(delete_query, (email,))
-        conn.commit()
-        cur.close()
-        conn.close()
+    if result["remaining"] == 0:
         return {
             "success": True,
             "message": "Favorite welfare removed and row deleted (no more favorites)",
@@ -130,88 +87,67 @@ def rm_fav_welfare(email: str, welfare: str, url: str):
             "row_deleted": True
         }
 
-    # 4) 배열이 아직 남아 있으면 row는 유지
-    conn.commit()
-    cur.close()
-    conn.close()
-
     return {
         "success": True,
         "message": "Favorite welfare removed",
         "removed": combined_value,
         "row_deleted": False,
-        "current_welfare": updated_welfare
+        "remaining": result["remaining"]
     }
 
+@router.post("/fav_welfare/batch")
+@on_lane("db")
+def batch_fav_welfare(body: FavWelfareBatchBody, principal: Optional[Principal] = Depends(optional_principal)):
+    """여러 건 추가 / 삭제를 한 트랜잭션으로 (삭제 먼저, 그다음 추가)."""
+    email = resolve_email(body.email, principal)
+    if not body.add and not body.remove:
+        return {"success": False, "message": "No changes"}
+
+    result = favorites_repo.apply_batch(
+        email,
+        add=[(item.welfare, item.url) for item in body.add],
+        remove=[item.welfare for item in body.remove],
+    )
+    return {"success": True, "message": "Favorites updated successfully", **result}
+
 @router.post("/update_inform")
+@on_lane("db")
 def update_inform(
-    email: str,
+    email: Optional[str] = None,
     location: Optional[str] = None,
     sex: Optional[str] = None,
-    age: Optional[int] = None
+    age: Optional[int] = None,
+    principal: Optional[Principal] = Depends(optional_principal),
 ):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # 1) 해당 email 존재하는지 확인
-    cur.execute("SELECT 1 FROM userinform WHERE email = %s", (email,))
-    exists = cur.fetchone()
-
-    if not exists:
-        cur.close()
-        conn.close()
-        return {"success": False, "message": "User not found"}
-
-    # 2) 업데이트할 필드만 동적 생성
-    update_fields = []
-    update_values = []
-
-    if location is not None:
-        update_fields.append("location = %s")
-        update_values.append(location)
+    email = resolve_email(email, principal)
 
-    if sex is not None:
-        update_fields.append("sex = %s")
-        update_values.append(sex)
-
-    if age is not None:
-        update_fields.append("age = %s")
-        update_values.append(age)
-
-    # 업데이트할 필드가 아무것도 없으면 실행 X
-    if not update_fields:
-        cur.close()
-        conn.close()
+    # 업데이트할 필드가 아무것도 없으면 실행 X (존재 여부는 캐시로)
+    if location is None and sex is None and age is None:
+        if not profile_repo.exists(email):
+            return {"success": False, "message": "User not found"}
         return {"success": False, "message": "No fields to update"}
 
-    # 동적으로 UPDATE SQL 생성
-    update_query = f"""
-        UPDATE userinform
-        SET {', '.join(update_fields)}
-        WHERE email = %s
-    """
-
-    update_values.append(email)  # 마지막에 email 추가 (WHERE)
-    cur.execute(update_query, tuple(update_values))
-    conn.commit()
-
-    # 3) 업데이트 후 최신 정보 조회
-    cur.execute(
-        "SELECT email, location, sex, age FROM userinform WHERE email = %s",
-        (email,)
-    )
-    row = cur.fetchone()
+    # 1) 주어진 필드만 UPDATE ... RETURNING 한 문장 (없는 email 이면 None, 캐시도 같이 갱신)
+    updated = profile_repo.update(email, location=location, sex=sex, age=age)
+    if updated is None:
+        return {"success": False, "message": "User not found"}
 
-    cur.close()
-    conn.close()
+    # 2) 세션 컨텍스트 등 프로필 기반 캐시 무효화
+    notify_profile_changed(email)
 
-    return {
+    user = {
+        "email": updated["email"],
+        "location": updated["location"],
+        "sex": updated["sex"],
+        "age": updated["age"],
+    }
+    response = {
         "success": True,
         "message": "User info updated",
-        "user": {
-            "email": row[0],
-            "location": row[1],
-            "sex": row[2],
-            "age": row[3],
-        }
+        "user": user,
     }
+    # 3) 토큰으로 호출했으면 바뀐 프로필 클레임으로 재발급
+    if principal is not None:
+        response["access_token"] = issue_token(principal.email, sub=principal.sub, name=principal.name, profile=user)
+        response["token_type"] = "bearer"
+    return response
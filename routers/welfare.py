@@ -1,77 +1,134 @@
 from __future__ import annotations
 
-import os
-from typing import Any, Dict, List, Optional
+import bisect
+from typing import Any, Dict, List, Optional, Tuple
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from core.auth import optional_principal, principal_profile, resolve_email
+from core.cursor import decode_key, encode_key
+from core.lanes import on_lane
+from core.deps import require_admin
+from schemas.auth import Principal
+from services.profile_repo import profile_repo
+from services.welfare_catalog import WELFARE_COLUMNS, RegionCatalog, catalog_cache, sort_key
 
 router = APIRouter()
 
 
-def _get_conn():
-    database_url = os.getenv("DATABASE_URL")
-    if not database_url:
-        raise HTTPException(status_code=500, detail="DATABASE_URL is not set")
-    return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+def encode_cursor(row: Dict[str, Any]) -> str:
+    return encode_key(sort_key(row))
 
-def get_welfare_list(email: str) -> List[Dict[str, Any]]:
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    name, url = decode_key(cursor, (str, str))
+    return name, url
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """'service_name,service_url' → ['service_name', 'service_url']"""
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in WELFARE_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 필드: {', '.join(unknown)}")
+    return wanted or None
+
+
+def get_welfare_catalog(email: str) -> RegionCatalog:
     """
-    email 값을 이용해 userinform 테이블에서 location(=sigun_name)을 조회하고
-    해당 지역의 복지 리스트를 반환한다.
+    email 로 사용자 지역(location)을 찾고, 그 지역의 카탈로그를 캐시에서 꺼낸다.
+    프로필 / 카탈로그 모두 캐시에 있으면 DB 를 타지 않는다.
     """
-
-    # 1) 이메일 기반 사용자 지역 조회
     try:
-        with _get_conn() as conn, conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT location 
-                FROM userinform 
-                WHERE email = %(email)s
-                """,
-                {"email": email}
-            )
-            user = cur.fetchone()
+        user = profile_repo.get(email)
+        if not user:
+            raise HTTPException(status_code=404, detail="해당 이메일로 등록된 사용자를 찾을 수 없습니다.")
+        return catalog_cache.get(user["location"])
     except psycopg2.Error as exc:
         raise HTTPException(status_code=500, detail=f"Database error: {exc}") from exc
 
-    if not user:
-        raise HTTPException(status_code=404, detail="해당 이메일로 등록된 사용자를 찾을 수 없습니다.")
-
-    sigun_name = user["location"]    # location 칼럼
-
-    # 2) welfare 조회
-    sql = """
-        SELECT
-            sigun_name,
-            service_name,
-            target,
-            support_cycle,
-            department,
-            apply_method,
-            service_url
-        FROM tbwelfaressrsm
-        WHERE sigun_name = %(sigun_name)s
+
+def get_welfare_page(
+        email: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        location: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
+    사용자 지역의 복지 리스트를 (rows, next_cursor) 로 반환한다.
 
-    try:
-        with _get_conn() as conn, conn.cursor() as cur:
-            cur.execute(sql, {"sigun_name": sigun_name})
-            rows = cur.fetchall()
-    except psycopg2.Error as exc:
-        raise HTTPException(status_code=500, detail=f"Database error: {exc}") from exc
+    - limit 이 없으면 지역 전체
+    - after 는 직전 페이지의 next_cursor (service_name, service_url 기준 keyset)
+    - location 을 알면 (토큰의 프로필 클레임) userinform 조회를 건너뛴다
+    """
+    catalog = catalog_cache.get(location) if location is not None else get_welfare_catalog(email)
+
+    start = bisect.bisect_right(catalog.keys, decode_cursor(after)) if after else 0
+    end = len(catalog.rows) if limit is None else min(start + limit, len(catalog.rows))
+    page = catalog.rows[start:end]
 
+    next_cursor = encode_cursor(page[-1]) if page and end < len(catalog.rows) else None
+
+    # 캐시된 dict 를 그대로 내보내지 않도록 항상 복사
+    if fields:
+        rows = [{k: r[k] for k in fields} for r in page]
+    else:
+        rows = [dict(r) for r in page]
+    return rows, next_cursor
+
+
+def get_welfare_list(email: str) -> List[Dict[str, Any]]:
+    """
+    email 값을 이용해 userinform 테이블에서 location(=sigun_name)을 조회하고
+    해당 지역의 복지 리스트를 반환한다.
+    """
+    rows, _ = get_welfare_page(email)
     return rows
 
 
 @router.get("/list")
+@on_lane("db")
 def list_welfare_services(
-        email: str
+        response: Response,
+        email: Optional[str] = None,
+        principal: Optional[Principal] = Depends(optional_principal),
+        limit: Optional[int] = Query(None, ge=1, le=500, description="페이지 크기 (없으면 전체)"),
+        after: Optional[str] = Query(None, description="직전 응답의 X-Next-Cursor 값"),
+        fields: Optional[str] = Query(None, description="콤마로 구분한 컬럼 목록"),
 ) -> List[Dict[str, Any]]:
-    return get_welfare_list(email)
+    """
+    응답 body 는 기존과 같은 리스트.
+    다음 페이지가 있으면 X-Next-Cursor 헤더에 커서를 담아준다.
+    """
+    email = resolve_email(email, principal)
+    profile = principal_profile(principal)
+    rows, next_cursor = get_welfare_page(
+        email,
+        limit=limit,
+        after=after,
+        fields=parse_fields(fields),
+        location=profile["location"] if profile else None,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+
+@router.post("/cache/invalidate", dependencies=[Depends(require_admin)])
+def invalidate_welfare_cache(sigun_name: Optional[str] = None):
+    """sigun_name 이 없으면 전체 지역 캐시를 비운다."""
+    removed = catalog_cache.invalidate(sigun_name)
+    return {"success": True, "removed": removed}
+
 
+@router.get("/cache/stats")
+def welfare_cache_stats():
+    return catalog_cache.stats()
 
 
 # @router.get("/list/senior", response_model=List[WelfareService])
@@ -115,7 +172,7 @@ def list_welfare_services(
 #         params["region"] = region
 #
 #     try:
-#         with _get_conn() as conn, conn.cursor() as cur:
+#         with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
 #             cur.execute(sql, params)
 #             rows = cur.fetchall()
 #     except psycopg2.Error as exc:
@@ -146,7 +203,7 @@ def list_welfare_services(
 #         params["region"] = region
 #
 #     try:
-#         with _get_conn() as conn, conn.cursor() as cur:
+#         with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
 #             cur.execute(sql, params)
 #             rows = cur.fetchall()
 #     except psycopg2.Error as exc:
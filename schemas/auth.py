@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class ProfileClaims(BaseModel):
+    """JWT 에 실어 보내는 프로필 (읽기 API 가 userinform 을 다시 조회하지 않도록)."""
+    v: int = 1                      # 클레임 형식 버전
+    location: Optional[str] = None
+    age: Optional[int] = None
+    sex: Optional[str] = None
+    at: float                       # 프로필을 읽은 시각 (epoch 초)
+
+
+class Principal(BaseModel):
+    """검증된 access token 의 주체."""
+    email: str
+    sub: Optional[str] = None
+    name: Optional[str] = None
+    kid: Optional[str] = None
+    exp: int
+    profile: Optional[ProfileClaims] = None
@@ -4,9 +4,10 @@ from typing import Optional
 class ChatRequest(BaseModel):
     session_id: Optional[str] = None  # 없으면 서버에서 새로 만들어줌
     message: str
-    email: str
+    email: Optional[str] = None  # Authorization 토큰이 있으면 생략 가능
 
 
 class ChatResponse(BaseModel):
     session_id: str
     reply: str
+    degraded: bool = False  # LLM 마감 초과 시 로컬 복지 목록으로 만든 대체 답변
@@ -9,8 +9,33 @@ class Facility(BaseModel):
     lat: float
     lng: float
 
+class FacilityCluster(BaseModel):
+    lat: float
+    lng: float
+    count: int
+    name: str  # 대표 시설명 (중심에 가장 가까운 시설)
+
+
 class FacilityResponse(BaseModel):
     code: int
     message: str
     data: List[Facility]
-    user_location: str
\ No newline at end of file
+    user_location: str
+    zoom: Optional[int] = None
+    clusters: Optional[List[FacilityCluster]] = None  # 저배율(zoom 낮음)일 때만 채워짐
+
+
+class NearbyFacility(Facility):
+    distance_m: float
+
+
+class NearbyFacilityResponse(BaseModel):
+    code: int
+    message: str
+    data: List[NearbyFacility]
+
+
+class FacilityListResponse(BaseModel):
+    code: int
+    message: str
+    data: List[Facility]
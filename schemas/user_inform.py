@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+FAV_BATCH_MAX = 500  # 배치 한 번에 add / remove 각각 최대 건수
+
 
 class UserInformBody(BaseModel):
     email: str
@@ -6,4 +11,15 @@ class UserInformBody(BaseModel):
     location: str
     sex: str
 class GoogleVerifyBody(BaseModel):
-    id_token: str
\ No newline at end of file
+    id_token: str
+
+
+class FavWelfareItem(BaseModel):
+    welfare: str = Field(min_length=1)
+    url: str = ""  # remove 에서는 쓰지 않음 (서비스명 기준)
+
+
+class FavWelfareBatchBody(BaseModel):
+    email: Optional[str] = None  # Authorization 토큰이 있으면 생략 가능
+    add: List[FavWelfareItem] = Field(default_factory=list, max_length=FAV_BATCH_MAX)
+    remove: List[FavWelfareItem] = Field(default_factory=list, max_length=FAV_BATCH_MAX)
@@ -0,0 +1,145 @@
+# services/admission.py
+"""
+챗봇 입장 제어 (admission control) + 부하 차단 (load shedding).
+
+LLM 을 부르기 전에 빠르게 거절해서, 한 사용자가 OpenAI rate limit 과
+서버 동시성을 다 쓰지 못하게 한다.
+
+- 사용자별 / 전체: 요청 수 버킷 + 예상 프롬프트 토큰 버킷 (분당 한도, 0 이면 끔)
+  → 넘으면 429 + Retry-After
+- LLM 동시성 대기열(llm_limiter.waiting)이 LLM_SHED_QUEUE 이상이면 503 + Retry-After
+  (이미 밀려 있는 요청의 지연이 더 늘지 않도록 새 요청을 받지 않음)
+
+예상 토큰 = 질문 토큰 + ADMISSION_PROMPT_OVERHEAD (페르소나/프로필/복지 목록/히스토리 몫).
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from core.config import env_float, env_int
+from core.ratelimit import KeyedBuckets, TokenBucket
+from services.history import count_tokens
+from services.llm import llm_limiter
+
+ADMISSION_PROMPT_OVERHEAD = env_int("ADMISSION_PROMPT_OVERHEAD", 1500)
+# 전체 버킷은 이 초 분량까지만 몰아서 허용
+GLOBAL_BURST_SECONDS = env_float("CHAT_GLOBAL_BURST_SECONDS", 10.0)
+
+
+def _per_second(per_minute: float) -> float:
+    return per_minute / 60.0
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        user_requests_per_min: float = 10,
+        user_request_burst: float = 5,
+        user_tokens_per_min: float = 20_000,
+        global_requests_per_min: float = 600,
+        global_tokens_per_min: float = 1_000_000,
+        shed_queue: int = 64,
+    ):
+        self.user_requests = (
+            KeyedBuckets(_per_second(user_requests_per_min), user_request_burst)
+            if user_requests_per_min > 0 else None
+        )
+        self.user_tokens = (
+            KeyedBuckets(_per_second(user_tokens_per_min), user_tokens_per_min)
+            if user_tokens_per_min > 0 else None
+        )
+        self.global_requests = self._global_bucket(global_requests_per_min, 1.0)
+        self.global_tokens = self._global_bucket(global_tokens_per_min, float(ADMISSION_PROMPT_OVERHEAD))
+        self.shed_queue = shed_queue
+        self.admitted = 0
+        self.rejected_user = 0
+        self.rejected_global = 0
+        self.shed = 0
+
+    @staticmethod
+    def _global_bucket(per_minute: float, min_capacity: float) -> Optional[TokenBucket]:
+        if per_minute <= 0:
+            return None
+        rate = _per_second(per_minute)
+        return TokenBucket(rate, max(min_capacity, rate * GLOBAL_BURST_SECONDS))
+
+    @staticmethod
+    def estimate_tokens(message: str) -> int:
+        return count_tokens(message or "") + ADMISSION_PROMPT_OVERHEAD
+
+    def check_load(self) -> None:
+        """LLM 대기열이 임계치를 넘었으면 바로 503."""
+        if self.shed_queue > 0 and llm_limiter.waiting >= self.shed_queue:
+            self.shed += 1
+            raise HTTPException(
+                status_code=503,
+                detail="지금은 요청이 많아 답변을 드리기 어렵습니다. 잠시 후 다시 시도해주세요.",
+                headers={"Retry-After": "2"},
+            )
+
+    def admit(self, user_key: str, message: str) -> None:
+        """
+        부하 확인 → 사용자/전체 버킷을 모두 검사한 뒤 전부 통과할 때만 차감.
+        (한 버킷에서 거절되면 다른 버킷도 깎지 않는다)
+        """
+        self.check_load()
+        tokens = self.estimate_tokens(message)
+
+        user_checks: List[Tuple[TokenBucket, float]] = []
+        if self.user_requests is not None:
+            user_checks.append((self.user_requests.get(user_key), 1))
+        if self.user_tokens is not None:
+            user_checks.append((self.user_tokens.get(user_key), tokens))
+        global_checks: List[Tuple[TokenBucket, float]] = []
+        if self.global_requests is not None:
+            global_checks.append((self.global_requests, 1))
+        if self.global_tokens is not None:
+            global_checks.append((self.global_tokens, tokens))
+
+        user_wait = max((b.wait_time(n) for b, n in user_checks), default=0.0)
+        if user_wait > 0:
+            self.rejected_user += 1
+            self._reject(user_wait, "요청이 너무 잦습니다. 잠시 후 다시 시도해주세요.")
+        global_wait = max((b.wait_time(n) for b, n in global_checks), default=0.0)
+        if global_wait > 0:
+            self.rejected_global += 1
+            self._reject(global_wait, "지금은 요청이 많아 답변을 드리기 어렵습니다. 잠시 후 다시 시도해주세요.")
+
+        for bucket, amount in user_checks + global_checks:
+            bucket.take(amount)
+        self.admitted += 1
+
+    @staticmethod
+    def _reject(wait: float, detail: str) -> None:
+        retry_after = 3600 if math.isinf(wait) else max(1, math.ceil(wait))
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "rejected_user": self.rejected_user,
+            "rejected_global": self.rejected_global,
+            "shed": self.shed,
+            "shed_queue": self.shed_queue,
+            "llm_waiting": llm_limiter.waiting,
+            "users_tracked": self.user_requests.stats()["keys"] if self.user_requests else 0,
+        }
+
+
+admission = AdmissionController(
+    user_requests_per_min=env_float("CHAT_USER_REQUESTS_PER_MIN", 10),
+    user_request_burst=env_float("CHAT_USER_REQUEST_BURST", 5),
+    user_tokens_per_min=env_float("CHAT_USER_TOKENS_PER_MIN", 20_000),
+    global_requests_per_min=env_float("CHAT_GLOBAL_REQUESTS_PER_MIN", 600),
+    global_tokens_per_min=env_float("CHAT_GLOBAL_TOKENS_PER_MIN", 1_000_000),
+    shed_queue=env_int("LLM_SHED_QUEUE", llm_limiter.max_concurrency),
+)
+
+
+def user_key_for(email: Optional[str], client_host: Optional[str]) -> str:
+    """email 이 없으면 클라이언트 IP 로 묶는다."""
+    email = (email or "").strip().lower()
+    return f"email:{email}" if email else f"ip:{client_host or 'unknown'}"
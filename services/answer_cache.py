@@ -0,0 +1,183 @@
+# services/answer_cache.py
+"""
+반복 질문 답변 캐시.
+
+키: (지역, 연령대, 성별) 버킷 + 정규화한 질문.
+연령대는 검색(services.retrieval.age_group)과 같은 구분이라 같은 버킷이면 같은 검색 결과가 나온다.
+조회 순서는 matcher 목록 순서대로 (기본: 정규화 완전일치 → 글자 n-gram 유사도).
+해당 지역 복지 카탈로그가 바뀌면 그 지역 항목은 모두 버린다.
+
+대화 맥락에 따라 답이 달라지므로 챗봇은 히스토리가 없는 첫 질문에만 사용한다.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Set, Tuple
+
+from core.config import env_float, env_int
+from services.retrieval import age_group
+
+Bucket = Tuple[str, str, str]  # (sigun_name, age_group, sex)
+
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def normalize_question(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def profile_bucket(sigun_name: str, profile: Optional[Dict[str, Any]]) -> Bucket:
+    profile = profile or {}
+    group = age_group(profile.get("age")) or "unknown"
+    sex = (profile.get("sex") or "").strip() or "unknown"
+    return (sigun_name or "", group, sex)
+
+
+# ============================
+# matcher
+# ============================
+class Matcher(Protocol):
+    def match(self, question: str, candidates: Iterable[str]) -> Optional[str]:
+        ...
+
+
+class ExactMatcher:
+    def match(self, question: str, candidates: Iterable[str]) -> Optional[str]:
+        return question if question in set(candidates) else None
+
+
+def _ngrams(text: str, n: int) -> Set[str]:
+    compact = text.replace(" ", "")
+    if len(compact) <= n:
+        return {compact} if compact else set()
+    return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+
+class NgramMatcher:
+    """공백을 뺀 글자 n-gram 집합의 Jaccard 유사도가 threshold 이상인 가장 비슷한 질문."""
+
+    def __init__(self, n: int = 2, threshold: float = 0.8):
+        self.n = n
+        self.threshold = threshold
+
+    def match(self, question: str, candidates: Iterable[str]) -> Optional[str]:
+        q = _ngrams(question, self.n)
+        if not q:
+            return None
+        best, best_score = None, self.threshold
+        for cand in candidates:
+            c = _ngrams(cand, self.n)
+            if not c:
+                continue
+            score = len(q & c) / len(q | c)
+            if score >= best_score:
+                best, best_score = cand, score
+        return best
+
+
+# ============================
+# 캐시
+# ============================
+class _Entry:
+    __slots__ = ("answer", "expires_at")
+
+    def __init__(self, answer: str, expires_at: float):
+        self.answer = answer
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        maxsize: int = 2048,
+        ttl: float = 3600.0,
+        matchers: Optional[List[Matcher]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.matchers: List[Matcher] = matchers if matchers is not None else [ExactMatcher(), NgramMatcher()]
+        self._entries: "OrderedDict[Tuple[Bucket, str], _Entry]" = OrderedDict()
+        self._by_bucket: Dict[Bucket, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fuzzy_hits = 0
+
+    def _remove(self, key: Tuple[Bucket, str]) -> None:
+        self._entries.pop(key, None)
+        questions = self._by_bucket.get(key[0])
+        if questions is not None:
+            questions.discard(key[1])
+            if not questions:
+                del self._by_bucket[key[0]]
+
+    def get(self, bucket: Bucket, question: str) -> Optional[str]:
+        norm = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            candidates = list(self._by_bucket.get(bucket, ()))
+            for i, matcher in enumerate(self.matchers):
+                found = matcher.match(norm, candidates)
+                if found is None:
+                    continue
+                key = (bucket, found)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry.expires_at <= now:
+                    self._remove(key)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if i:
+                    self.fuzzy_hits += 1
+                return entry.answer
+            self.misses += 1
+            return None
+
+    def set(self, bucket: Bucket, question: str, answer: str) -> None:
+        key = (bucket, normalize_question(question))
+        with self._lock:
+            self._entries[key] = _Entry(answer, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_bucket.setdefault(bucket, set()).add(key[1])
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_region(self, sigun_name: Optional[str] = None) -> int:
+        """sigun_name 지역(없으면 전체)의 답변을 버린다."""
+        with self._lock:
+            keys = [k for k in self._entries if sigun_name is None or k[0][0] == sigun_name]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "buckets": len(self._by_bucket),
+                "hits": self.hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+answer_cache = AnswerCache(
+    maxsize=env_int("ANSWER_CACHE_SIZE", 2048),
+    ttl=env_float("ANSWER_CACHE_TTL", 3600.0),
+    matchers=[
+        ExactMatcher(),
+        NgramMatcher(threshold=env_float("ANSWER_CACHE_SIMILARITY", 0.8)),
+    ],
+)
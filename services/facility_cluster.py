@@ -0,0 +1,74 @@
+# services/facility_cluster.py
+"""
+지도 zoom 레벨별 격자 클러스터.
+
+zoom 이 낮을 때는 개별 Facility 대신 격자 칸 단위의 (중심, 개수, 대표 이름)만 내려준다.
+결과는 (지역, zoom) 단위로 캐싱하고, 원본 시설 리스트가 바뀌면(캐시 갱신) 다시 계산한다.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.cache import TTLCache
+from core.config import env_float, env_int
+from schemas.map import Facility, FacilityCluster
+
+# 이 zoom 이상이면 개별 시설을 그대로 반환
+CLUSTER_MAX_ZOOM = env_int("FACILITY_CLUSTER_MAX_ZOOM", 14)
+# 256px 타일 한 장을 몇 칸으로 나눌지 (4 → 약 64px 격자)
+CELLS_PER_TILE = env_int("FACILITY_CLUSTER_CELLS_PER_TILE", 4)
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lng, max_lat, max_lng)
+
+
+def cell_deg_for_zoom(zoom: int) -> float:
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+def in_bbox(lat: float, lng: float, bbox: Optional[BBox]) -> bool:
+    if bbox is None:
+        return True
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+
+def build_clusters(facilities: Sequence[Facility], zoom: int) -> List[FacilityCluster]:
+    cell = cell_deg_for_zoom(zoom)
+    buckets: Dict[Tuple[int, int], List[Facility]] = {}
+    for f in facilities:
+        key = (math.floor(f.lat / cell), math.floor(f.lng / cell))
+        buckets.setdefault(key, []).append(f)
+
+    clusters = []
+    for members in buckets.values():
+        lat = sum(f.lat for f in members) / len(members)
+        lng = sum(f.lng for f in members) / len(members)
+        rep = min(members, key=lambda f: (f.lat - lat) ** 2 + (f.lng - lng) ** 2)
+        clusters.append(FacilityCluster(lat=lat, lng=lng, count=len(members), name=rep.name))
+    clusters.sort(key=lambda c: -c.count)
+    return clusters
+
+
+class ClusterCache:
+    def __init__(self, maxsize: int = 512, ttl: float = 86400.0):
+        self._cache: TTLCache[Tuple[Sequence[Facility], List[FacilityCluster]]] = TTLCache(maxsize, ttl)
+
+    def get(self, region: str, facilities: Sequence[Facility], zoom: int) -> List[FacilityCluster]:
+        key = (region, zoom)
+        cached = self._cache.get(key)
+        # facility_client 가 갱신하면 새 리스트 객체가 오므로 identity 로 변경 감지
+        if cached is not None and cached[0] is facilities:
+            return cached[1]
+        clusters = build_clusters(facilities, zoom)
+        self._cache.set(key, (facilities, clusters))
+        return clusters
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+cluster_cache = ClusterCache(
+    maxsize=env_int("FACILITY_CLUSTER_CACHE_SIZE", 512),
+    ttl=env_float("FACILITY_CLUSTER_CACHE_TTL", 86400.0),
+)
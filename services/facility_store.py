@@ -0,0 +1,143 @@
+# services/facility_store.py
+"""
+HtygdWelfaclt 전체 데이터셋의 로컬 사본 + 격자 공간 인덱스.
+
+- sync(): upstream 을 전부 페이지로 받아 JSON 파일(FACILITY_STORE_PATH)에 저장
+- load(): 파일을 읽어 메모리 인덱스를 만든다 (앱 기동 시)
+- nearest() / bbox(): upstream 호출 없이 메모리에서 응답
+
+    python -m services.facility_store   # 수동 동기화
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from core.config import env_float
+from core.geo import GridIndex
+from schemas.map import Facility
+from services.gyeonggi_api import GyeonggiFacilityClient, facility_client, row_to_facility
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "facilities.json"
+
+
+class StoredFacility(NamedTuple):
+    facility: Facility
+    sigun_name: Optional[str]
+
+
+def _coords(item: StoredFacility) -> Tuple[float, float]:
+    return item.facility.lat, item.facility.lng
+
+
+class FacilityStore:
+    def __init__(self, path: Optional[str] = None, cell_deg: float = 0.01):
+        self.path = Path(path or os.getenv("FACILITY_STORE_PATH") or DEFAULT_PATH)
+        self.cell_deg = cell_deg
+        self._index: GridIndex[StoredFacility] = GridIndex([], _coords, cell_deg)
+        self._lock = threading.Lock()
+        self.synced_at: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+
+    # ----------------------------
+    # 적재
+    # ----------------------------
+    def _build(self, records: List[StoredFacility]) -> None:
+        index = GridIndex(records, _coords, self.cell_deg)
+        with self._lock:
+            self._index = index
+            self.loaded_at = time.time()
+
+    def load(self) -> int:
+        """파일에서 인덱스를 다시 만든다. 파일이 없으면 0."""
+        if not self.path.exists():
+            logger.info("facility store %s not found; run sync first", self.path)
+            return 0
+        with self.path.open(encoding="utf-8") as f:
+            payload = json.load(f)
+        records = [
+            StoredFacility(Facility(**r["facility"]), r.get("sigun_name"))
+            for r in payload.get("rows", [])
+        ]
+        self.synced_at = payload.get("synced_at")
+        self._build(records)
+        return len(records)
+
+    def _save(self, records: List[StoredFacility]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        payload = {
+            "synced_at": self.synced_at,
+            "rows": [
+                {"facility": r.facility.model_dump(), "sigun_name": r.sigun_name}
+                for r in records
+            ],
+        }
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, self.path)  # 읽는 쪽이 반쯤 쓴 파일을 보지 않도록
+
+    async def sync(self, client: Optional[GyeonggiFacilityClient] = None) -> int:
+        """upstream 전체를 페이지 단위로 받아 저장 + 인덱스 교체."""
+        client = client or facility_client
+        rows = await client.fetch_all_rows()
+
+        records = []
+        for row in rows:
+            facility = row_to_facility(row)
+            if facility is not None:
+                records.append(StoredFacility(facility, row.get("SIGUNGU_NM")))
+
+        self.synced_at = time.time()
+        await asyncio.to_thread(self._save, records)
+        self._build(records)
+        logger.info("facility store synced: %d rows (%d with coordinates)", len(rows), len(records))
+        return len(records)
+
+    # ----------------------------
+    # 조회
+    # ----------------------------
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def nearest(self, lat: float, lng: float, k: int = 20, max_distance_m: float = float("inf")):
+        return self._index.nearest(lat, lng, k, max_distance_m)
+
+    def bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> List[StoredFacility]:
+        return self._index.bbox(min_lat, min_lng, max_lat, max_lng)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "facilities": len(self._index),
+            "cells": len(self._index.cells),
+            "cell_deg": self.cell_deg,
+            "synced_at": self.synced_at,
+            "loaded_at": self.loaded_at,
+        }
+
+
+facility_store = FacilityStore(cell_deg=env_float("FACILITY_GRID_CELL_DEG", 0.01))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    async def _main() -> None:
+        try:
+            print(await facility_store.sync())
+        finally:
+            await facility_client.aclose()
+
+    asyncio.run(_main())
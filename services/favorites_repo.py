@@ -0,0 +1,194 @@
+# services/favorites_repo.py
+"""
+관심 복지 저장소 (user_favorite_welfare, 행 하나 = 사용자 한 명의 서비스 하나).
+
+예전 userfavwelfare 는 email 당 한 행에 "서비스명,URL" 문자열을 TEXT[] 로 쌓아서
+- 추가/삭제마다 배열 전체를 다시 쓰고 (array_append 라 중복도 허용)
+- 페이지로 나눠 읽을 수 없고
+- 서비스명에 콤마가 있으면 문자열이 깨졌다.
+
+지금은 (email, welfare) unique 행으로 저장하고
+- add / remove 는 행 하나만 건드리는 SQL 한 문장
+- apply_batch 는 여러 건을 한 트랜잭션 (DELETE 한 문장 + INSERT 한 문장)
+- page 는 (email, created_at DESC, id DESC) / (email, welfare) 인덱스를 타는 keyset 페이지
+테이블 / 인덱스 / 예전 배열 데이터 이관은 services.schema.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from core.db import connection
+
+SORTS = ("recent", "name")
+
+# 정렬별 (ORDER BY, keyset 비교식, 커서 키 컬럼)
+_ORDER = {
+    "recent": ("created_at DESC, id DESC", "(created_at, id) < (%(k0)s, %(k1)s)", ("created_at", "id")),
+    "name": ("welfare ASC", "welfare > %(k0)s", ("welfare",)),
+}
+
+# 정렬별 커서 키 값의 JSON 타입 (created_at 은 ISO 8601 문자열)
+CURSOR_TYPES = {
+    "recent": (str, int),
+    "name": (str,),
+}
+
+
+def favorite_value(welfare: str, url: str) -> str:
+    """예전 응답 형식("서비스명,URL") 호환용."""
+    return f"{welfare},{url}"
+
+
+def _cursor_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class FavoritesRepository:
+    def page(
+        self,
+        email: str,
+        sort: str = "recent",
+        limit: Optional[int] = None,
+        after: Optional[Sequence[Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """
+        (items, next_key). items 는 {"welfare", "url", "created_at"}.
+        after 는 직전 페이지의 next_key, limit 이 없으면 끝까지.
+        """
+        if sort not in _ORDER:
+            raise ValueError(f"unknown sort: {sort!r}")
+        order_by, keyset, key_columns = _ORDER[sort]
+        if after is not None:
+            after = self._parse_key(sort, after)
+
+        params: Dict[str, Any] = {"email": email}
+        where = "email = %(email)s"
+        if after is not None:
+            where += f" AND {keyset}"
+            params.update({f"k{i}": value for i, value in enumerate(after)})
+        sql = f"SELECT id, welfare, url, created_at FROM user_favorite_welfare WHERE {where} ORDER BY {order_by}"
+        if limit is not None:
+            # 한 건 더 읽어서 다음 페이지 유무 판단
+            sql += " LIMIT %(limit)s"
+            params["limit"] = limit + 1
+
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+
+        next_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_key = [_cursor_value(rows[-1][column]) for column in key_columns]
+        items = [
+            {"welfare": r["welfare"], "url": r["url"], "created_at": _cursor_value(r["created_at"])}
+            for r in rows
+        ]
+        return items, next_key
+
+    @staticmethod
+    def _parse_key(sort: str, key: Sequence[Any]) -> List[Any]:
+        """커서 키 검증 + DB 값으로 변환. 맞지 않으면 ValueError (DB 까지 가서 DataError 가 나지 않도록)."""
+        types = CURSOR_TYPES[sort]
+        if len(key) != len(types) or any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(key, types)):
+            raise ValueError("cursor does not match sort")
+        if sort == "recent":
+            created_at = datetime.fromisoformat(key[0])
+            if created_at.tzinfo is None:
+                raise ValueError("cursor timestamp without timezone")
+            return [created_at, key[1]]
+        return list(key)
+
+    def add(self, email: str, welfare: str, url: str) -> bool:
+        """추가 (이미 있으면 URL 만 갱신). 새로 추가됐으면 True."""
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO user_favorite_welfare (email, welfare, url)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (email, welfare) DO UPDATE
+                SET url = EXCLUDED.url
+                WHERE user_favorite_welfare.url IS DISTINCT FROM EXCLUDED.url
+                RETURNING (xmax = 0)
+                """,
+                (email, welfare, url),
+            )
+            row = cur.fetchone()
+        return bool(row and row[0])
+
+    def remove(self, email: str, welfare: str) -> Dict[str, Any]:
+        """
+        서비스 하나 삭제 (서비스명으로). 한 문장으로 삭제 + 남은 개수까지.
+        (바깥 SELECT 는 삭제 전 스냅샷을 보므로 삭제된 수를 뺀다)
+
+        반환: {"removed": bool, "url": 삭제된 행의 URL 또는 None, "remaining": int}
+        """
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                WITH del AS (
+                    DELETE FROM user_favorite_welfare
+                    WHERE email = %(email)s AND welfare = %(welfare)s
+                    RETURNING url
+                )
+                SELECT
+                    (SELECT count(*) FROM del),
+                    (SELECT min(url) FROM del),
+                    (SELECT count(*) FROM user_favorite_welfare WHERE email = %(email)s)
+                """,
+                {"email": email, "welfare": welfare},
+            )
+            removed, url, before = cur.fetchone()
+        return {"removed": removed > 0, "url": url, "remaining": before - removed}
+
+    def apply_batch(
+        self,
+        email: str,
+        add: Iterable[Tuple[str, str]] = (),
+        remove: Iterable[str] = (),
+    ) -> Dict[str, int]:
+        """
+        여러 건을 한 트랜잭션으로: remove 먼저, 그다음 add (둘 다 있는 서비스는 추가된 상태로 끝난다).
+        add 안에서 같은 서비스가 여러 번이면 마지막 URL 을 쓴다.
+
+        반환: {"added": 새로 추가된 수, "updated": URL 이 바뀐 수, "removed": 삭제된 수, "total": 처리 후 개수}
+        """
+        additions = dict(add)
+        removals = sorted(set(remove))
+        removed = added = updated = 0
+
+        with connection() as conn, conn.cursor() as cur:
+            if removals:
+                cur.execute(
+                    "DELETE FROM user_favorite_welfare WHERE email = %s AND welfare = ANY(%s)",
+                    (email, removals),
+                )
+                removed = cur.rowcount
+            if additions:
+                cur.execute(
+                    """
+                    INSERT INTO user_favorite_welfare (email, welfare, url)
+                    SELECT %s, t.welfare, t.url
+                    FROM unnest(%s::text[], %s::text[]) AS t(welfare, url)
+                    ON CONFLICT (email, welfare) DO UPDATE
+                    SET url = EXCLUDED.url
+                    WHERE user_favorite_welfare.url IS DISTINCT FROM EXCLUDED.url
+                    RETURNING (xmax = 0)
+                    """,
+                    (email, list(additions), list(additions.values())),
+                )
+                for (inserted,) in cur.fetchall():
+                    if inserted:
+                        added += 1
+                    else:
+                        updated += 1
+            cur.execute("SELECT count(*) FROM user_favorite_welfare WHERE email = %s", (email,))
+            total = cur.fetchone()[0]
+
+        return {"added": added, "updated": updated, "removed": removed, "total": total}
+
+
+favorites_repo = FavoritesRepository()
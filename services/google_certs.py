@@ -0,0 +1,192 @@
+# services/google_certs.py
+"""
+Google ID token 검증용 서명 인증서 캐시 + 검증 결과 memo.
+
+google_id_token.verify_oauth2_token(token, Request(), ...) 은 호출마다
+https://www.googleapis.com/oauth2/v1/certs 를 다시 받아온다 (로그인마다 외부 HTTPS 1회).
+
+- 인증서는 응답의 Cache-Control max-age 동안 메모리에 두고,
+  만료 GOOGLE_CERTS_REFRESH_MARGIN 초 전부터는 백그라운드 스레드에서 미리 갱신
+- 토큰 header 의 kid 가 캐시에 없으면 (Google 키 교체 직후) 강제 갱신 후 한 번 더 시도
+  (강제 갱신은 GOOGLE_CERTS_MIN_REFRESH 초에 한 번까지만)
+- 검증에 성공한 토큰은 sha256(token) 기준으로 exp 까지 memo → 같은 토큰으로 다시 로그인하면 즉시 반환
+- GOOGLE_CERTS_URL 로 로컬 테스트용 키 서버를 가리킬 수 있다
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import requests
+
+from core.cache import TTLCache
+from core.config import env_float, env_int
+
+try:
+    from google.auth import jwt as google_jwt
+except Exception:  # optional at dev time; real env will install deps
+    google_jwt = None
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def parse_max_age(cache_control: Optional[str], default: float) -> float:
+    match = _MAX_AGE.search(cache_control or "")
+    return float(match.group(1)) if match else default
+
+
+class GoogleCertCache:
+    def __init__(
+        self,
+        url: str = GOOGLE_CERTS_URL,
+        default_max_age: float = 3600.0,
+        refresh_margin: float = 300.0,
+        min_refresh_interval: float = 30.0,
+        timeout: float = 5.0,
+    ):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.refresh_margin = refresh_margin
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.fetches = 0
+        self.background_refreshes = 0
+        self.forced_refreshes = 0
+        self.fetch_errors = 0
+
+    def _fetch(self) -> None:
+        """인증서를 받아서 교체 (self._lock 을 잡은 상태에서 호출)."""
+        try:
+            response = self._session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            certs = response.json()
+            if not isinstance(certs, dict) or not certs:
+                raise ValueError(f"unexpected certs payload from {self.url}")
+        except Exception:
+            self.fetch_errors += 1
+            raise
+        now = time.monotonic()
+        self._certs = certs
+        self._fetched_at = now
+        self._expires_at = now + parse_max_age(response.headers.get("Cache-Control"), self.default_max_age)
+        self.fetches += 1
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                self._fetch()
+            self.background_refreshes += 1
+        except Exception as exc:
+            # 기존 인증서가 아직 유효하므로 다음 호출에서 다시 시도
+            logger.warning("background refresh of Google certs failed: %s", exc)
+        finally:
+            self._refreshing = False
+
+    def get(self, force: bool = False) -> Mapping[str, str]:
+        now = time.monotonic()
+        if force:
+            with self._lock:
+                # 방금 누가 받아왔으면 그걸 쓴다 (잘못된 kid 로 반복 호출돼도 외부 요청은 제한)
+                if now - self._fetched_at >= self.min_refresh_interval:
+                    self.forced_refreshes += 1
+                    self._fetch()
+                return self._certs
+
+        if self._certs and now < self._expires_at:
+            if self._expires_at - now < self.refresh_margin and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._background_refresh, name="google-certs-refresh", daemon=True).start()
+            return self._certs
+
+        with self._lock:
+            if not self._certs or time.monotonic() >= self._expires_at:
+                self._fetch()
+            return self._certs
+
+    def warm(self) -> None:
+        """기동 시 미리 받아 두기 (실패해도 첫 로그인 때 다시 시도)."""
+        try:
+            self.get()
+        except Exception as exc:
+            logger.warning("could not prefetch Google certs: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "url": self.url,
+            "kids": sorted(self._certs),
+            "expires_in": round(self._expires_at - now, 1) if self._certs else None,
+            "fetches": self.fetches,
+            "background_refreshes": self.background_refreshes,
+            "forced_refreshes": self.forced_refreshes,
+            "fetch_errors": self.fetch_errors,
+        }
+
+
+class GoogleTokenVerifier:
+    """verify_oauth2_token 과 같은 검사(서명 / aud / exp / iss)를 캐시된 인증서로."""
+
+    def __init__(self, certs: GoogleCertCache, memo_size: int = 10_000, clock_skew: int = 10):
+        self.certs = certs
+        self.clock_skew = clock_skew
+        self._memo: TTLCache[Dict[str, Any]] = TTLCache(maxsize=memo_size, ttl=3600.0)
+
+    @property
+    def available(self) -> bool:
+        return google_jwt is not None
+
+    @staticmethod
+    def _memo_key(token: str, audience: str) -> Tuple[str, str]:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest(), audience
+
+    def _decode(self, token: str, audience: str) -> Dict[str, Any]:
+        kid = google_jwt.decode_header(token).get("kid")
+        certs = self.certs.get()
+        if kid and kid not in certs:
+            # Google 키 교체 직후일 수 있으니 새로 받아서 한 번 더
+            certs = self.certs.get(force=True)
+        return google_jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=self.clock_skew)
+
+    def verify(self, token: str, audience: str) -> Dict[str, Any]:
+        key = self._memo_key(token, audience)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        info = self._decode(token, audience)
+        if info.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {info.get('iss')}")
+
+        remaining = float(info.get("exp", 0)) - time.time()
+        if remaining > 0:
+            self._memo.set(key, info, ttl=remaining)
+        return info
+
+    def stats(self) -> Dict[str, Any]:
+        return {"certs": self.certs.stats(), "verified_memo": self._memo.stats()}
+
+
+google_verifier = GoogleTokenVerifier(
+    GoogleCertCache(
+        default_max_age=env_float("GOOGLE_CERTS_DEFAULT_MAX_AGE", 3600.0),
+        refresh_margin=env_float("GOOGLE_CERTS_REFRESH_MARGIN", 300.0),
+        min_refresh_interval=env_float("GOOGLE_CERTS_MIN_REFRESH", 30.0),
+    ),
+    memo_size=env_int("GOOGLE_TOKEN_MEMO_SIZE", 10_000),
+)
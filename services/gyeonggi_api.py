@@ -0,0 +1,340 @@
+# services/gyeonggi_api.py
+"""
+경기도 공공데이터(openapi.gg.go.kr) HtygdWelfaclt 클라이언트.
+
+- 앱 기동 시 만든 httpx.AsyncClient 하나를 재사용 (keep-alive / TLS 재사용)
+- SIGUNGU_NM 별 응답 캐시: fresh TTL 이 지나면 stale 을 먼저 돌려주고 백그라운드 갱신
+- 같은 지역에 대한 동시 miss 는 하나의 upstream 요청으로 합침
+- 1000건이 넘는 지역은 나머지 페이지를 동시에 받음, 여러 시군은 병합 + 중복 제거
+- upstream 동시 요청 수 제한 + 실패 시 stale 데이터로 대체
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from core.config import env_float, env_int
+from core.singleflight import SingleFlight
+from schemas.map import Facility
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://openapi.gg.go.kr/HtygdWelfaclt"
+DATASET = "HtygdWelfaclt"
+PAGE_SIZE = 1000  # upstream 이 허용하는 최대 pSize
+# RESULT.CODE 중 정상으로 보는 것 (INFO-200 = 해당 데이터 없음, 빈 결과로 캐시해도 됨)
+OK_RESULT_CODES = ("INFO-000", "INFO-200")
+
+# 경기도 31개 시군 (SIGUNGU_NM 값). 사용자 입력 지역은 이 안에서만 upstream 에 보낸다
+SIGUNGU_NAMES = frozenset({
+    "가평군", "고양시", "과천시", "광명시", "광주시", "구리시", "군포시", "김포시",
+    "남양주시", "동두천시", "부천시", "성남시", "수원시", "시흥시", "안산시", "안성시",
+    "안양시", "양주시", "양평군", "여주시", "연천군", "오산시", "용인시", "의왕시",
+    "의정부시", "이천시", "파주시", "평택시", "포천시", "하남시", "화성시",
+})
+
+
+def row_to_facility(row: Dict[str, Any]) -> Optional[Facility]:
+    """API row → Facility. 좌표가 없는 행은 None."""
+    try:
+        lat = float(row.get("REFINE_WGS84_LAT"))
+        lng = float(row.get("REFINE_WGS84_LOGT"))
+    except (TypeError, ValueError):
+        return None
+    return Facility(
+        name=row.get("FACLT_NM"),
+        phone=row.get("DETAIL_TELNO"),
+        lot_addr=row.get("REFINE_LOTNO_ADDR"),
+        road_addr=row.get("REFINE_ROADNM_ADDR"),
+        lo_addr=row.get("HMPG_URL", "wwww."),
+        lat=lat,
+        lng=lng,
+    )
+
+
+def extract_rows(json_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # JSON 구조에 따라 row 목록 추출
+    child = json_data.get(DATASET, [])
+    return next(
+        (v.get("row", []) for v in child if isinstance(v, dict) and "row" in v),
+        []
+    )
+
+
+def extract_total_count(json_data: Dict[str, Any]) -> int:
+    # {"HtygdWelfaclt": [{"head": [{"list_total_count": N}, {"RESULT": ...}]}, {"row": [...]}]}
+    for part in json_data.get(DATASET, []):
+        if not isinstance(part, dict):
+            continue
+        for head in part.get("head", []):
+            if isinstance(head, dict) and "list_total_count" in head:
+                try:
+                    return int(head["list_total_count"])
+                except (TypeError, ValueError):
+                    return 0
+    return 0
+
+
+def extract_result(json_data: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    RESULT 의 (CODE, MESSAGE). 데이터가 있으면 head 안에, 없거나 오류면 최상위에 온다.
+    {"RESULT": {"CODE": "ERROR-290", "MESSAGE": "인증키가 유효하지 않습니다..."}}
+    """
+    candidates = [json_data.get("RESULT")]
+    for part in json_data.get(DATASET, []):
+        if isinstance(part, dict):
+            candidates.extend(h.get("RESULT") for h in part.get("head", []) if isinstance(h, dict))
+    for result in candidates:
+        if isinstance(result, dict) and result.get("CODE"):
+            return result.get("CODE"), result.get("MESSAGE")
+    return None, None
+
+
+class _Entry:
+    __slots__ = ("facilities", "fetched_at")
+
+    def __init__(self, facilities: List[Facility]):
+        self.facilities = facilities
+        self.fetched_at = time.monotonic()
+
+
+class GyeonggiFacilityClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        fresh_ttl: float = 3600.0,
+        stale_ttl: float = 86400.0,
+        maxsize: int = 64,
+        max_concurrency: int = 4,
+        timeout: float = 10.0,
+    ):
+        self.api_key = api_key
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._http: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._flights = SingleFlight()
+        self._upstream_sem = asyncio.Semaphore(max_concurrency)
+        self._background: set = set()
+        self._merged: "OrderedDict[Tuple[str, ...], Tuple[List[List[Facility]], List[Facility]]]" = OrderedDict()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+
+    # ----------------------------
+    # lifecycle
+    # ----------------------------
+    async def start(self) -> None:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _client(self) -> httpx.AsyncClient:
+        # lifespan 이 안 도는 환경 대비 lazy start
+        if self._http is None:
+            await self.start()
+        return self._http
+
+    # ----------------------------
+    # upstream
+    # ----------------------------
+    async def fetch_page(
+        self,
+        page: int = 1,
+        page_size: int = 1000,
+        sigun_name: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """한 페이지의 raw row 와 전체 건수(list_total_count)를 반환."""
+        params = {
+            "Key": self.api_key or os.getenv("GYEONGGI_OPENAPI_KEY"),
+            "Type": "json",  # <-- JSON을 직접 받음
+            "pIndex": page,
+            "pSize": page_size,
+        }
+        if sigun_name:
+            params["SIGUNGU_NM"] = sigun_name
+        client = await self._client()
+        async with self._upstream_sem:
+            self.upstream_calls += 1
+            try:
+                resp = await client.get(API_URL, params=params)
+            except httpx.HTTPError as exc:
+                raise HTTPException(status_code=502, detail=f"Gyeonggi API unreachable: {exc}") from exc
+
+        if resp.status_code != 200:
+            raise HTTPException(
+                status_code=resp.status_code,
+                detail="Failed to fetch Gyeonggi API"
+            )
+
+        json_data = resp.json()
+        code, message = extract_result(json_data)
+        if code is not None and code not in OK_RESULT_CODES:
+            # 200 이어도 키 오류 / 호출 한도 초과 등은 빈 지역으로 캐시하면 안 된다
+            raise HTTPException(status_code=502, detail=f"Gyeonggi API error {code}: {message}")
+        return extract_rows(json_data), extract_total_count(json_data)
+
+    async def fetch_all_rows(self, sigun_name: Optional[str] = None, page_size: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+        """
+        첫 페이지에서 list_total_count 를 읽고 나머지 페이지는 동시에 받는다.
+        (동시성은 _upstream_sem 으로 제한)
+        """
+        rows, total = await self.fetch_page(1, page_size, sigun_name)
+        pages = -(-total // page_size)
+        if pages > 1:
+            rest = await asyncio.gather(
+                *(self.fetch_page(p, page_size, sigun_name) for p in range(2, pages + 1))
+            )
+            for more, _ in rest:
+                rows.extend(more)
+        return rows
+
+    async def _fetch_upstream(self, sigun_name: Optional[str]) -> List[Facility]:
+        rows = await self.fetch_all_rows(sigun_name)
+        facilities = []
+        for row in rows:
+            facility = row_to_facility(row)
+            if facility is not None:
+                facilities.append(facility)
+        return facilities
+
+    async def _fetch_and_store(self, key: str, sigun_name: Optional[str]) -> List[Facility]:
+        try:
+            facilities = await self._fetch_upstream(sigun_name)
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        self._store(key, facilities)
+        return facilities
+
+    async def _load(self, key: str, sigun_name: Optional[str]) -> List[Facility]:
+        """
+        동시 호출을 하나의 upstream 요청으로 합쳐서 캐시에 채운다.
+        공유 task 로 돌리므로 먼저 요청한 클라이언트가 끊겨도 기다리던 나머지는 결과를 받는다.
+        """
+        return await self._flights.do(key, lambda: self._fetch_and_store(key, sigun_name))
+
+    def _store(self, key: str, facilities: List[Facility]) -> None:
+        self._cache[key] = _Entry(facilities)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    async def _revalidate(self, key: str, sigun_name: Optional[str]) -> None:
+        try:
+            await self._load(key, sigun_name)
+        except Exception as exc:
+            logger.warning("background refresh for %s failed: %s", key, exc)
+
+    # ----------------------------
+    # public
+    # ----------------------------
+    async def get_facilities(self, sigun_name: Optional[str]) -> List[Facility]:
+        key = sigun_name or ""
+        entry = self._cache.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            age = now - entry.fetched_at
+            self._cache.move_to_end(key)
+            if age < self.fresh_ttl:
+                self.hits += 1
+                return entry.facilities
+            if age < self.stale_ttl:
+                # stale-while-revalidate: 일단 기존 데이터 반환, 갱신은 뒤에서
+                self.stale_hits += 1
+                if not self._flights.inflight(key):
+                    task = asyncio.create_task(self._revalidate(key, sigun_name))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return entry.facilities
+
+        self.misses += 1
+        try:
+            return await self._load(key, sigun_name)
+        except Exception:
+            # upstream 장애 시 만료된 데이터라도 있으면 그걸로 응답
+            if entry is not None:
+                logger.warning("serving expired facility cache for %s", key)
+                return entry.facilities
+            raise
+
+    async def get_facilities_multi(self, sigun_names: Sequence[Optional[str]]) -> List[Facility]:
+        """
+        여러 시군의 시설을 동시에 받아 (이름, 좌표) 기준으로 중복 제거해 합친다.
+        구성 리스트가 그대로면 같은 merged 리스트 객체를 돌려준다 (클러스터 캐시용).
+        """
+        names = sorted({n for n in sigun_names if n})
+        if len(names) <= 1:
+            return await self.get_facilities(names[0] if names else None)
+
+        parts = await asyncio.gather(*(self.get_facilities(n) for n in names))
+        key = tuple(names)
+        memo = self._merged.get(key)
+        if memo is not None and len(memo[0]) == len(parts) and all(a is b for a, b in zip(memo[0], parts)):
+            return memo[1]
+
+        seen = set()
+        merged: List[Facility] = []
+        for part in parts:
+            for f in part:
+                dedupe_key = (f.name, round(f.lat, 6), round(f.lng, 6))
+                if dedupe_key in seen:
+                    continue
+                seen.add(dedupe_key)
+                merged.append(f)
+        self._merged[key] = (parts, merged)
+        while len(self._merged) > self.maxsize:
+            self._merged.popitem(last=False)
+        return merged
+
+    def invalidate(self, sigun_name: Optional[str] = None) -> int:
+        self._merged.clear()
+        if sigun_name is None:
+            n = len(self._cache)
+            self._cache.clear()
+            return n
+        return 1 if self._cache.pop(sigun_name, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "fresh_ttl": self.fresh_ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self._flights.coalesced,
+            "inflight": self._flights.stats()["inflight"],
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+        }
+
+
+facility_client = GyeonggiFacilityClient(
+    fresh_ttl=env_float("FACILITY_CACHE_TTL", 3600.0),
+    stale_ttl=env_float("FACILITY_CACHE_STALE_TTL", 86400.0),
+    maxsize=env_int("FACILITY_CACHE_SIZE", 64),
+    max_concurrency=env_int("FACILITY_UPSTREAM_CONCURRENCY", 4),
+    timeout=env_float("FACILITY_UPSTREAM_TIMEOUT", 10.0),
+)
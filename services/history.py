@@ -0,0 +1,166 @@
+# services/history.py
+"""
+대화 히스토리 토큰 예산 관리.
+
+- 히스토리가 HISTORY_TOKEN_BUDGET 을 넘으면 최근 HISTORY_KEEP_TURNS 턴만 원문으로 두고
+  나머지는 LLM 으로 요약해서 session["summary"] 에 누적(rolling summary)한다.
+- 요약은 응답을 돌려준 뒤 백그라운드에서 돌고, 그 전까지는 budget_history() 가
+  예산 안에 들어가는 최근 메시지만 잘라 보내서 프롬프트 크기를 일정하게 유지한다.
+
+토큰 수는 tiktoken(있으면)으로 로컬에서 센다.
+tiktoken 은 BPE 파일이 캐시에 없으면 네트워크로 받아오므로, 여기서는 첫 사용 시점에
+TIKTOKEN_CACHE_DIR 에 파일이 이미 있을 때만 로드한다 (없으면 근사치, 네트워크 접근 없음).
+빌드 단계에서 미리 채워 두려면:
+
+    TIKTOKEN_CACHE_DIR=... python -c "import tiktoken; tiktoken.get_encoding('o200k_base')"
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.config import env_int
+
+try:
+    import tiktoken
+except Exception:  # optional at dev time; 없으면 근사치로 계산
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKEN_BUDGET = env_int("HISTORY_TOKEN_BUDGET", 2000)
+HISTORY_KEEP_TURNS = env_int("HISTORY_KEEP_TURNS", 3)
+SUMMARY_MAX_TOKENS = env_int("HISTORY_SUMMARY_MAX_TOKENS", 300)
+
+# 메시지 하나당 role/구분자 오버헤드 (OpenAI chat 포맷 기준 대략치)
+_PER_MESSAGE_OVERHEAD = 4
+
+ENCODING_NAME = "o200k_base"  # gpt-4o 계열
+_ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+
+_encoding = None
+_encoding_resolved = False
+_encoding_lock = threading.Lock()
+
+
+def _cached_bpe_path() -> str:
+    """tiktoken 이 BPE 파일을 찾는 캐시 경로 (tiktoken.load.read_file_cached 와 같은 규칙)."""
+    cache_dir = (
+        os.environ.get("TIKTOKEN_CACHE_DIR")
+        or os.environ.get("DATA_GYM_CACHE_DIR")
+        or os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    )
+    return os.path.join(cache_dir, hashlib.sha1(_ENCODING_URL.encode()).hexdigest())
+
+
+def _get_encoding():
+    """첫 호출 때 한 번만: 캐시에 BPE 파일이 있으면 로드, 없으면 None (근사치 사용)."""
+    global _encoding, _encoding_resolved
+    if _encoding_resolved:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_resolved:
+            if tiktoken is not None:
+                path = _cached_bpe_path()
+                if os.path.exists(path):
+                    try:
+                        _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                    except Exception as exc:
+                        logger.warning("tiktoken encoding unavailable, falling back to estimate: %s", exc)
+                else:
+                    logger.warning("tiktoken %s not cached at %s, falling back to estimate", ENCODING_NAME, path)
+            _encoding_resolved = True
+    return _encoding
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # 근사: 한글은 글자당 ~1 token, 그 외는 4글자당 ~1 token
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return count_tokens(message.get("content") or "") + _PER_MESSAGE_OVERHEAD
+
+
+def history_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def budget_history(messages: List[Dict[str, Any]], budget: int = HISTORY_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+    """뒤에서부터 예산 안에 들어가는 만큼만 (항상 user 메시지부터 시작하도록)."""
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    for m in reversed(messages):
+        cost = message_tokens(m)
+        if kept and used + cost > budget:
+            break
+        kept.append(m)
+        used += cost
+    kept.reverse()
+    while kept and kept[0].get("role") != "user":
+        kept.pop(0)
+    return kept
+
+
+def needs_compaction(session: Dict[str, Any]) -> bool:
+    messages = session.get("messages", [])
+    return len(messages) > HISTORY_KEEP_TURNS * 2 and history_tokens(messages) > HISTORY_TOKEN_BUDGET
+
+
+SUMMARY_PROMPT = (
+    "다음은 복지 안내 챗봇과 사용자의 이전 대화야. "
+    "이후 대화에 필요한 사실(사용자 상황, 관심 있는 복지 서비스, 이미 안내한 내용)만 "
+    "한국어로 간결하게 요약해. 기존 요약이 있으면 합쳐서 하나로 만들어."
+)
+
+
+async def summarize_old_turns(
+    session: Dict[str, Any],
+    summarize: Callable[[List[Dict[str, str]]], Awaitable[str]],
+) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+    """
+    최근 HISTORY_KEEP_TURNS 턴을 뺀 앞쪽 메시지를 기존 요약과 합쳐 요약한다.
+    (요약할 게 없거나 결과가 비면 None). 세션은 건드리지 않는다.
+    """
+    if not needs_compaction(session):
+        return None
+    messages = session["messages"]
+    cut = len(messages) - HISTORY_KEEP_TURNS * 2
+    old = list(messages[:cut])
+
+    transcript = "\n".join(f"{m['role']}: {m.get('content') or ''}" for m in old)
+    previous: Optional[str] = session.get("summary")
+    prompt = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": (f"[기존 요약]\n{previous}\n\n" if previous else "") + f"[대화]\n{transcript}"},
+    ]
+    summary = (await summarize(prompt)).strip()
+    if not summary:
+        return None
+    return old, summary
+
+
+def apply_summary(session: Dict[str, Any], old: List[Dict[str, Any]], summary: str) -> bool:
+    """
+    요약한 앞쪽 메시지(old)가 session 에 그대로 남아 있을 때만 잘라내고 요약으로 교체.
+    요약하는 동안 새 턴이 붙었거나 (저장소에서 다시 읽은 사본이라도) 내용으로 비교하므로 안전하다.
+    """
+    current = session["messages"]
+    if len(current) < len(old) or current[:len(old)] != old:
+        return False
+    del current[:len(old)]
+    session["summary"] = summary
+    return True
+
@@ -0,0 +1,303 @@
+# services/llm.py
+"""
+OpenAI 비동기 클라이언트 + 동시 호출 제한 + 지연 꼬리 보호.
+
+LLM 호출은 이벤트 루프에서 await 로 기다리므로 스레드를 점유하지 않는다.
+LLM_MAX_CONCURRENCY 로 동시에 upstream 에 나가는 요청 수만 제한한다.
+
+complete() 는
+- 호출 전체에 LLM_DEADLINE 초 상한 (동시성 슬롯 대기 포함, 넘으면 LLMUnavailable → 호출부가 로컬 대체 답변)
+- 시도마다 LLM_ATTEMPT_TIMEOUT 초 상한
+- 재시도 가능한 오류(타임아웃/연결/429/5xx)는 LLM_MAX_RETRIES 번까지 full jitter 백오프
+- LLM_HEDGE 가 켜져 있으면 최근 p95 지연이 지나도 응답이 없을 때 같은 요청을 하나 더 보내
+  먼저 끝난 쪽을 쓴다 (동시성 슬롯이 남을 때만)
+
+스트리밍 답변(routers.chatbot)은 슬롯 대기 + 스트림 생성이 min(LLM_DEADLINE, LLM_ATTEMPT_TIMEOUT),
+마지막 토큰까지 전체가 LLM_STREAM_DEADLINE 초 안에 끝나야 한다.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+from core.config import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")  # 비용 아끼려면 gpt-4o-mini 추천
+
+LLM_DEADLINE = env_float("LLM_DEADLINE", 20.0)
+LLM_ATTEMPT_TIMEOUT = env_float("LLM_ATTEMPT_TIMEOUT", 12.0)
+LLM_MAX_RETRIES = env_int("LLM_MAX_RETRIES", 2)
+LLM_RETRY_BASE_DELAY = env_float("LLM_RETRY_BASE_DELAY", 0.5)
+LLM_HEDGE = env_bool("LLM_HEDGE", False)
+LLM_HEDGE_MIN_DELAY = env_float("LLM_HEDGE_MIN_DELAY", 1.0)
+LLM_STREAM_DEADLINE = env_float("LLM_STREAM_DEADLINE", 60.0)
+
+# 재시도 / 타임아웃은 complete() 가 직접 관리 (SDK 내부 재시도와 겹치지 않게 끔)
+async_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    timeout=LLM_ATTEMPT_TIMEOUT,
+)
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMUnavailable(Exception):
+    """마감 시간 안에 LLM 응답을 못 받음 (타임아웃 / 재시도 소진 / 복구 불가 오류)."""
+
+
+class LLMLimiter:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.total = 0
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """timeout 초 안에 슬롯을 못 받으면 TimeoutError."""
+        self.waiting += 1
+        try:
+            if timeout is None:
+                await self._sem.acquire()
+            else:
+                async with asyncio.timeout(max(0.0, timeout)):
+                    await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.total += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "total": self.total,
+        }
+
+
+llm_limiter = LLMLimiter(env_int("LLM_MAX_CONCURRENCY", 64))
+
+
+class _UsageCounters:
+    __slots__ = ("calls", "prompt_tokens", "cached_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class UsageStats:
+    """
+    completion usage 누적. cached_tokens 는 provider 의 자동 프롬프트 캐시가
+    재사용한 입력 토큰 수 → 프롬프트 prefix 가 안정적인지 확인하는 지표.
+
+    호출 목적(purpose)별로 따로 센다. 최상위 값은 답변 턴("chat")만:
+    히스토리 요약("summary")은 프롬프트 모양이 달라 cached_ratio 를 흐리기 때문.
+
+    provider 캐시는 같은 prefix 가 1024 토큰 이상일 때만 적중한다. 답변 턴의 고정 prefix 는
+    페르소나 + 지역 서비스 목록(routers.chatbot, REGION_DIGEST_MAX_ITEMS) 이라서
+    서비스가 적은 지역이나 REGION_DIGEST_MAX_ITEMS=0 이면 cached_ratio 는 0 근처에 머문다.
+    """
+
+    def __init__(self):
+        self._by_purpose: Dict[str, _UsageCounters] = {}
+
+    def record(self, usage: Any, purpose: str = "chat") -> None:
+        if usage is None:
+            return
+        counters = self._by_purpose.setdefault(purpose, _UsageCounters())
+        details = getattr(usage, "prompt_tokens_details", None)
+        counters.calls += 1
+        counters.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        counters.cached_tokens += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        counters.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        chat = self._by_purpose.get("chat") or _UsageCounters()
+        return {
+            **chat.stats(),
+            "by_purpose": {name: c.stats() for name, c in self._by_purpose.items()},
+        }
+
+
+usage_stats = UsageStats()
+
+
+class LatencyStats:
+    """최근 성공 호출 지연(초) 창 + 재시도/헤지/마감 초과 카운터."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+        self.failures = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+
+    def record_deadline_miss(self) -> None:
+        self.deadline_misses += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """표본이 충분할 때만 p95 기반 헤지 지연."""
+        if len(self._samples) < 20:
+            return None
+        return max(LLM_HEDGE_MIN_DELAY, self.percentile(0.95) or 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95, p99 = (self.percentile(q) for q in (0.5, 0.95, 0.99))
+        return {
+            "samples": len(self._samples),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "p99": round(p99, 3) if p99 is not None else None,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_misses": self.deadline_misses,
+            "failures": self.failures,
+            "deadline": LLM_DEADLINE,
+            "attempt_timeout": LLM_ATTEMPT_TIMEOUT,
+            "stream_deadline": LLM_STREAM_DEADLINE,
+            "max_retries": LLM_MAX_RETRIES,
+            "hedge": LLM_HEDGE,
+        }
+
+
+latency_stats = LatencyStats()
+
+
+async def _attempt(messages: List[Dict[str, str]], timeout: float, **kwargs: Any):
+    async with llm_limiter.slot():
+        started = time.monotonic()
+        completion = await asyncio.wait_for(
+            async_client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                **kwargs,
+            ),
+            timeout,
+        )
+    latency_stats.record(time.monotonic() - started)
+    return completion
+
+
+async def _hedged_attempt(messages: List[Dict[str, str]], timeout: float, **kwargs: Any):
+    """p95 가 지나도 안 끝나면 두 번째 요청을 보내고 먼저 성공한 쪽을 쓴다."""
+    delay = latency_stats.hedge_delay() if LLM_HEDGE else None
+    if delay is None or delay >= timeout:
+        return await _attempt(messages, timeout, **kwargs)
+
+    primary = asyncio.ensure_future(_attempt(messages, timeout, **kwargs))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        # 슬롯이 남을 때만 헤지 (과부하 중에 부하를 두 배로 만들지 않도록)
+        if not done and llm_limiter.waiting == 0 and llm_limiter.active < llm_limiter.max_concurrency:
+            latency_stats.hedges += 1
+            tasks.add(asyncio.ensure_future(_attempt(messages, timeout - delay, **kwargs)))
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        latency_stats.hedge_wins += 1
+                    return task.result()
+                error = task.exception()
+        raise error  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def complete(
+    messages: List[Dict[str, str]],
+    deadline: Optional[float] = None,
+    purpose: str = "chat",
+    **kwargs: Any,
+):
+    """
+    chat.completions.create 를 동시성 제한 + 마감 시간 + 재시도 안에서 호출.
+    마감 안에 성공하지 못하면 LLMUnavailable. purpose 는 usage 통계 구분용.
+    """
+    budget = LLM_DEADLINE if deadline is None else deadline
+    ends_at = time.monotonic() + budget
+    attempt = 0
+    while True:
+        remaining = ends_at - time.monotonic()
+        if remaining <= 0:
+            latency_stats.record_deadline_miss()
+            raise LLMUnavailable(f"LLM deadline of {budget:.1f}s exceeded")
+        try:
+            # 슬롯 대기까지 마감 안에서 (_attempt 의 시도 타임아웃은 슬롯을 받은 뒤부터)
+            completion = await asyncio.wait_for(
+                _hedged_attempt(messages, min(LLM_ATTEMPT_TIMEOUT, remaining), **kwargs),
+                remaining,
+            )
+        except RETRYABLE_ERRORS as e:
+            if time.monotonic() >= ends_at:
+                latency_stats.record_deadline_miss()
+                raise LLMUnavailable(f"LLM deadline of {budget:.1f}s exceeded") from e
+            attempt += 1
+            if attempt > LLM_MAX_RETRIES:
+                latency_stats.record_failure()
+                raise LLMUnavailable(f"LLM call failed after {attempt} attempts: {e!r}") from e
+            # full jitter: 0 ~ base * 2^n, 남은 시간 안에서만
+            backoff = random.uniform(0, LLM_RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+            latency_stats.retries += 1
+            logger.warning("LLM attempt %d failed (%r), retrying in %.2fs", attempt, e, backoff)
+            await asyncio.sleep(min(backoff, max(0.0, ends_at - time.monotonic())))
+            continue
+        except openai.APIError as e:
+            latency_stats.record_failure()
+            raise LLMUnavailable(f"LLM call failed: {e!r}") from e
+        usage_stats.record(getattr(completion, "usage", None), purpose)
+        return completion
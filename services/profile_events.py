@@ -0,0 +1,47 @@
+# services/profile_events.py
+"""
+사용자 프로필(userinform) 변경 알림.
+
+post_inform / update_inform 이 커밋 후 notify_profile_changed(email) 를 부르면
+changed_since() 로 "이 시각 이후 바뀌었나?" 를 확인할 수 있다.
+(챗봇 세션 컨텍스트 스냅샷 / 토큰의 프로필 클레임이 이걸로 오래된 값을 버린다.
+ profile_repo 캐시는 쓰기 경로가 put() 으로 직접 갱신한다)
+
+(프로세스 내부 알림이라 워커마다 따로 동작한다)
+
+변경 시각은 TTLCache 에 PROFILE_CHANGE_TTL(기본 JWT_TTL) 동안만 둔다.
+기록이 만료됐거나 LRU 로 밀려났을 수 있는 시점 이전의 ts 는 "바뀌었음" 으로 답해서
+오래된 토큰 프로필 클레임 / 세션 컨텍스트를 믿지 않게 한다 (DB 에서 다시 읽는 쪽으로).
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from core.cache import TTLCache
+from core.config import env_float, env_int
+
+_lock = threading.Lock()
+# 토큰의 프로필 클레임(core.auth)이 JWT_TTL 동안 이 기록에 기대므로 TTL 은 그 이상
+_changed_at: TTLCache[float] = TTLCache(
+    maxsize=env_int("PROFILE_CHANGE_LOG_SIZE", 100_000),
+    ttl=env_float("PROFILE_CHANGE_TTL", float(env_int("JWT_TTL", 7 * 24 * 3600))),
+)
+_forgotten_before = 0.0  # 이 시각 이전의 변경은 LRU 로 밀려나 기록이 없을 수 있다
+
+
+def notify_profile_changed(email: str) -> None:
+    global _forgotten_before
+    now = time.time()
+    with _lock:
+        if len(_changed_at) >= _changed_at.maxsize and _changed_at.peek(email) is None:
+            _forgotten_before = now
+        _changed_at.set(email, now)
+
+
+def changed_since(email: str, ts: float) -> bool:
+    at = _changed_at.get(email)
+    if at is not None:
+        return at >= ts
+    # 기록이 없어도, 기록을 잃었을 수 있는 시점보다 오래된 ts 면 바뀐 것으로 본다
+    return ts < time.time() - _changed_at.ttl or ts <= _forgotten_before
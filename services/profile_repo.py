@@ -0,0 +1,152 @@
+# services/profile_repo.py
+"""
+userinform 프로필 저장소 (LRU + TTL 캐시 앞단).
+
+auth / welfare / map / user_inform 이 각자 보내던
+`SELECT ... FROM userinform WHERE email = %s` 를 여기 한 곳으로 모은다.
+
+- get(email): 캐시 → 없으면 DB. 없는 email 도 PROFILE_NEGATIVE_TTL 동안 캐시 (negative cache)
+- put(profile): 쓰기 경로(post_inform / update_inform / google_verify 신규 가입)가 커밋 후 호출 (write-through)
+- 조회 도중 같은 email 에 쓰기가 있었으면 조회 결과는 캐시에 넣지 않는다 (오래된 값으로 덮지 않도록)
+- 다른 워커의 쓰기는 PROFILE_CACHE_TTL 안에서 반영된다
+
+쓰기(create_if_missing / update)는 각각 SQL 한 문장(한 번의 왕복)으로 끝나고
+커밋 후 바로 캐시를 갱신한다. ON CONFLICT (email) 은 services.schema 의 unique index 가 필요.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from core.cache import TTLCache
+from core.config import env_float, env_int
+from core.db import connection
+
+PROFILE_COLUMNS = ("email", "location", "age", "sex")
+_RETURNING = ", ".join(PROFILE_COLUMNS)
+UPDATABLE_COLUMNS = ("location", "age", "sex")
+
+_NOT_FOUND = object()
+
+
+def _row_to_profile(row: Any) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        return {k: row[k] for k in PROFILE_COLUMNS}
+    return dict(zip(PROFILE_COLUMNS, row))
+
+
+class ProfileRepository:
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0, negative_ttl: float = 30.0):
+        self._cache: TTLCache[Any] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._written_at: TTLCache[float] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.negative_ttl = negative_ttl
+        self.queries = 0
+
+    @staticmethod
+    def _fetch(cur, email: str) -> Optional[Dict[str, Any]]:
+        cur.execute(
+            f"SELECT {', '.join(PROFILE_COLUMNS)} FROM userinform WHERE email = %s LIMIT 1",
+            (email,),
+        )
+        return _row_to_profile(cur.fetchone())
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        """프로필 dict (복사본) 또는 None."""
+        cached = self._cache.get(email)
+        if cached is _NOT_FOUND:
+            return None
+        if cached is not None:
+            return dict(cached)
+
+        started = time.monotonic()
+        self.queries += 1
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            profile = self._fetch(cur, email)
+
+        written = self._written_at.get(email)
+        if written is None or written < started:
+            if profile is None:
+                self._cache.set(email, _NOT_FOUND, ttl=self.negative_ttl)
+            else:
+                self._cache.set(email, profile)
+        return dict(profile) if profile is not None else None
+
+    def cached(self, email: str) -> bool:
+        """캐시에 양성 항목이 있는지 (DB 조회 없음)."""
+        value = self._cache.get(email)
+        return value is not None and value is not _NOT_FOUND
+
+    def exists(self, email: str) -> bool:
+        return self.get(email) is not None
+
+    def put(self, profile: Dict[str, Any]) -> None:
+        """쓰기 커밋 후 최신 프로필로 캐시 갱신."""
+        email = profile["email"]
+        self._written_at.set(email, time.monotonic())
+        self._cache.set(email, {k: profile.get(k) for k in PROFILE_COLUMNS})
+
+    # ----------------------------
+    # 쓰기 (한 문장씩)
+    # ----------------------------
+    def create_if_missing(self, email: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        없으면 빈 프로필로 INSERT, 있으면 기존 행. (profile, created) 반환.
+        SELECT → INSERT 두 번 왕복 / 동시 가입 시 중복 행 문제를 ON CONFLICT 로 없앤다.
+
+        DO NOTHING + 별도 SELECT 는 동시 가입이 이 문장의 스냅샷 뒤에 커밋하면 행을 못 본다.
+        DO UPDATE(값은 그대로)는 충돌한 행을 잠그고 항상 RETURNING 하므로 언제나 한 행이 나온다.
+        xmax = 0 이면 이번 문장이 INSERT 한 행.
+        """
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                INSERT INTO userinform (email, age, location, sex)
+                VALUES (%s, 0, '', '')
+                ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+                RETURNING {_RETURNING}, (xmax = 0) AS created
+                """,
+                (email,),
+            )
+            row = cur.fetchone()
+        profile = _row_to_profile(row)
+        self.put(profile)
+        return dict(profile), bool(row["created"])
+
+    def update(self, email: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """
+        주어진 컬럼만 UPDATE ... RETURNING 한 문장으로. 없는 email 이면 None.
+        fields 의 값이 None 인 항목은 건너뛴다.
+        """
+        changes = {k: v for k, v in fields.items() if v is not None}
+        unknown = set(changes) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"not updatable: {', '.join(sorted(unknown))}")
+        if not changes:
+            return self.get(email)
+
+        assignments = ", ".join(f"{column} = %({column})s" for column in changes)
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                f"UPDATE userinform SET {assignments} WHERE email = %(email)s RETURNING {_RETURNING}",
+                {**changes, "email": email},
+            )
+            profile = _row_to_profile(cur.fetchone())
+        if profile is None:
+            self._cache.set(email, _NOT_FOUND, ttl=self.negative_ttl)
+            return None
+        self.put(profile)
+        return dict(profile)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "negative_ttl": self.negative_ttl, "queries": self.queries}
+
+
+profile_repo = ProfileRepository(
+    maxsize=env_int("PROFILE_CACHE_SIZE", 10_000),
+    ttl=env_float("PROFILE_CACHE_TTL", 60.0),
+    negative_ttl=env_float("PROFILE_NEGATIVE_TTL", 30.0),
+)
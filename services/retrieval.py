@@ -0,0 +1,137 @@
+# services/retrieval.py
+"""
+복지 서비스 BM25 검색 (외부 임베딩 없이 로컬에서).
+
+한국어는 띄어쓰기/조사 때문에 단어 단위 매칭이 약해서
+공백 단위 토큰을 다시 글자 bigram 으로 쪼개 색인한다.
+    "노인일자리" → 노인, 인일, 일자, 자리
+지역 카탈로그(RegionCatalog)마다 한 번 만들어 derive() 로 메모리에 들고 있는다.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 필드별 가중치 (토큰을 가중치만큼 반복해서 넣는 방식)
+FIELD_WEIGHTS = (
+    ("service_name", 3),
+    ("target", 2),
+    ("support_cycle", 1),
+    ("department", 1),
+)
+
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def tokenize(text: Optional[str], n: int = 2) -> List[str]:
+    """소문자화 + 기호 제거 후 단어별 글자 n-gram. n 보다 짧은 단어는 그대로."""
+    if not text:
+        return []
+    tokens: List[str] = []
+    for word in _NON_WORD.sub(" ", text.lower()).split():
+        if len(word) <= n:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return tokens
+
+
+AGE_GROUP_TERMS = {
+    "senior": ["노인", "어르신"],
+    "child": ["아동", "청소년"],
+    "youth": ["청년"],
+    "adult": [],
+}
+
+
+def age_group(age: Any) -> Optional[str]:
+    """복지 대상 구분 기준 연령대 (나이를 모르면 None)."""
+    try:
+        age = int(age or 0)
+    except (TypeError, ValueError):
+        return None
+    if age <= 0:
+        return None
+    if age >= 65:
+        return "senior"
+    if age < 19:
+        return "child"
+    if age <= 39:
+        return "youth"
+    return "adult"
+
+
+def profile_terms(profile: Optional[Dict[str, Any]]) -> str:
+    """
+    나이/성별을 복지 대상 표현으로 바꿔 질의에 보탠다.
+    정확한 나이 대신 age_group 만 있는 프로필(답변 캐시용 버킷 프로필)도 받는다.
+    """
+    if not profile:
+        return ""
+    group = profile.get("age_group") or age_group(profile.get("age"))
+    terms: List[str] = list(AGE_GROUP_TERMS.get(group, []))
+    sex = (profile.get("sex") or "").strip()
+    if sex in ("여", "여성", "F", "f", "female"):
+        terms += ["여성"]
+    return " ".join(terms)
+
+
+class BM25Index:
+    def __init__(self, rows: Sequence[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.rows = list(rows)
+        self.k1 = k1
+        self.b = b
+        self.doc_len: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+        for doc_id, row in enumerate(self.rows):
+            tokens: List[str] = []
+            for field, weight in FIELD_WEIGHTS:
+                tokens.extend(tokenize(row.get(field)) * weight)
+            self.doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((doc_id, tf))
+
+        n = len(self.rows)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 8) -> List[Tuple[float, Dict[str, Any]]]:
+        """(점수, row) 상위 k 개. 매칭이 하나도 없으면 빈 리스트."""
+        if not self.rows or k <= 0:
+            return []
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / (self.avgdl or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        top = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        return [(score, self.rows[doc_id]) for doc_id, score in top]
+
+
+def build_welfare_index(rows: Sequence[Dict[str, Any]]) -> BM25Index:
+    return BM25Index(rows)
+
+
+def retrieve_services(
+    index: BM25Index,
+    question: str,
+    profile: Optional[Dict[str, Any]] = None,
+    k: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    질문 + 프로필 기반 상위 k 개 서비스.
+    아무것도 안 걸리면 카탈로그 앞쪽 k 개로 대체 (프롬프트가 비지 않도록).
+    """
+    query = f"{question} {profile_terms(profile)}".strip()
+    hits = [row for _, row in index.search(query, k)]
+    return hits or index.rows[:k]
@@ -0,0 +1,278 @@
+# services/schema.py
+"""
+코드가 기대하는 DB 제약조건 / 테이블 (전부 여러 번 실행해도 안전한 DDL).
+
+적용은 배포 단계에서 명시적으로 한다 (앱 기동 시에는 확인만):
+
+    python -m services.schema                      # 적용 + 확인
+    python -m services.schema --dedupe-userinform  # userinform 중복 email 정리 후 적용
+
+앱 기동 시 check_schema() 는 REQUIRED_OBJECTS 가 모두 있는지만 보고, 없거나 DB 에
+연결할 수 없으면 경고 로그만 남긴다 (DB 가 잠깐 죽어 있어도 앱 기동은 되도록, core.db 와 같은 규칙).
+
+- userinform.email unique index (profile_repo 의 ON CONFLICT (email) 용)
+  CREATE UNIQUE INDEX CONCURRENTLY 라 만드는 동안 userinform 쓰기를 막지 않는다.
+  예전 SELECT → INSERT 경쟁으로 생긴 중복 email 이 있으면 index 생성이 실패하고
+  (남은 INVALID index 는 다음 실행 때 지우고 다시 만든다) 로그에 남는다.
+  중복은 --dedupe-userinform 으로 email 마다 한 행만 남긴 뒤 다시 실행한다:
+  location / age 가 채워진 행을 우선, 같으면 ctid 가 큰 행(대개 나중에 쓰인 행)을 남긴다.
+- user_favorite_welfare: 관심 복지 한 건 = 한 행, (email, welfare) unique
+- 예전 userfavwelfare 의 "서비스명,URL" 배열을 user_favorite_welfare 로 복사한다 (예전 테이블은 그대로).
+  마지막 콤마 기준으로 나누고 (서비스명의 콤마는 살림), 배열 순서를 created_at 순서로 유지,
+  중복 항목은 하나만 남긴다. email 별로 지난번에 복사한 배열을 user_favorite_welfare_legacy_sync 에
+  기억해 두고 그 뒤에 바뀐 부분(예전 버전이 추가/삭제한 항목)만 반영하므로,
+  - 다시 실행해도 새 테이블에서 지운 즐겨찾기가 되살아나지 않고
+  - rolling deploy 중 예전 버전은 자기 테이블을 계속 쓰며,
+    배포가 끝난 뒤 한 번 더 실행하면 그 사이 예전 버전이 쓴 변경까지 넘어온다.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Tuple
+
+import psycopg2
+from fastapi import HTTPException
+
+from core.db import connection
+
+logger = logging.getLogger(__name__)
+
+# (이름, SQL). 단계마다 autocommit 으로 실행하고 (CONCURRENTLY 는 트랜잭션 안에서 못 돈다),
+# 앞 단계가 실패해도 다음 단계는 따로 시도한다.
+MIGRATIONS: List[Tuple[str, str]] = [
+    (
+        "userinform: unique email",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS userinform_email_key ON userinform (email)",
+    ),
+    (
+        "user_favorite_welfare: table",
+        """
+        CREATE TABLE IF NOT EXISTS user_favorite_welfare (
+            id BIGSERIAL PRIMARY KEY,
+            email TEXT NOT NULL,
+            welfare TEXT NOT NULL,
+            url TEXT NOT NULL DEFAULT '',
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT user_favorite_welfare_email_welfare_key UNIQUE (email, welfare)
+        )
+        """,
+    ),
+    (
+        "user_favorite_welfare: recent index",
+        """
+        CREATE INDEX IF NOT EXISTS user_favorite_welfare_recent_idx
+        ON user_favorite_welfare (email, created_at DESC, id DESC)
+        """,
+    ),
+    (
+        "user_favorite_welfare_legacy_sync: table",
+        """
+        CREATE TABLE IF NOT EXISTS user_favorite_welfare_legacy_sync (
+            email TEXT PRIMARY KEY,
+            copied TEXT[] NOT NULL DEFAULT '{}'
+        )
+        """,
+    ),
+    (
+        "userfavwelfare: copy array changes into user_favorite_welfare",
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('userfavwelfare') IS NULL THEN
+                RETURN;
+            END IF;
+            -- 여러 곳에서 동시에 실행해도 한 번에 하나만
+            PERFORM pg_advisory_xact_lock(hashtext('user_favorite_welfare_legacy_sync'));
+
+            -- 예전 배열 (email, 항목, 처음 나온 위치) / 지난번에 복사한 항목
+            CREATE TEMP TABLE legacy_fav ON COMMIT DROP AS
+            SELECT f.email, t.item, min(t.ord) AS ord
+            FROM userfavwelfare f,
+                 unnest(coalesce(f.welfare, '{}'::text[])) WITH ORDINALITY AS t(item, ord)
+            WHERE t.item IS NOT NULL AND t.item <> ''
+            GROUP BY f.email, t.item;
+
+            CREATE TEMP TABLE copied_fav ON COMMIT DROP AS
+            SELECT s.email, c.item
+            FROM user_favorite_welfare_legacy_sync s, unnest(s.copied) AS c(item);
+
+            -- 삭제 먼저, 그다음 추가 (따로 실행해야 "A,u1" → "A,u2" 교체가 삭제로 끝나지 않는다).
+            -- 예전 버전이 마지막 항목을 지우며 행까지 삭제한 email 도 여기서 지워진다
+            DELETE FROM user_favorite_welfare u
+            USING (
+                SELECT c.email, coalesce((regexp_match(c.item, '^(.*),([^,]*)$'))[1], c.item) AS welfare
+                FROM copied_fav c
+                WHERE NOT EXISTS (SELECT 1 FROM legacy_fav l WHERE l.email = c.email AND l.item = c.item)
+            ) r
+            WHERE u.email = r.email AND u.welfare = r.welfare;
+
+            INSERT INTO user_favorite_welfare (email, welfare, url, created_at)
+            SELECT DISTINCT ON (email, welfare) email, welfare, url, created_at
+            FROM (
+                SELECT a.email,
+                       coalesce(a.parts[1], a.item) AS welfare,
+                       coalesce(a.parts[2], '') AS url,
+                       now() + a.ord * interval '1 microsecond' AS created_at,
+                       a.ord
+                FROM (
+                    SELECT l.*, regexp_match(l.item, '^(.*),([^,]*)$') AS parts
+                    FROM legacy_fav l
+                    WHERE NOT EXISTS (SELECT 1 FROM copied_fav c WHERE c.email = l.email AND c.item = l.item)
+                ) a
+            ) added
+            -- 같은 서비스가 여러 번이면 배열에서 마지막 것 (ON CONFLICT 가 한 행을 두 번 못 건드림)
+            ORDER BY email, welfare, ord DESC
+            ON CONFLICT (email, welfare) DO UPDATE
+            SET url = EXCLUDED.url
+            WHERE user_favorite_welfare.url IS DISTINCT FROM EXCLUDED.url;
+
+            UPDATE user_favorite_welfare_legacy_sync s
+            SET copied = '{}'
+            WHERE cardinality(s.copied) > 0
+              AND NOT EXISTS (SELECT 1 FROM legacy_fav l WHERE l.email = s.email);
+
+            -- 바뀐 email 만 다시 쓴다 (실행할 때마다 모든 행을 갱신하지 않도록)
+            INSERT INTO user_favorite_welfare_legacy_sync (email, copied)
+            SELECT email, array_agg(item ORDER BY item)
+            FROM legacy_fav
+            GROUP BY email
+            ON CONFLICT (email) DO UPDATE
+            SET copied = EXCLUDED.copied
+            WHERE user_favorite_welfare_legacy_sync.copied IS DISTINCT FROM EXCLUDED.copied;
+        END
+        $$
+        """,
+    ),
+]
+
+
+# 코드가 의존하는 테이블 / index 이름 (to_regclass 로 확인)
+REQUIRED_OBJECTS: Tuple[str, ...] = (
+    "userinform_email_key",
+    "user_favorite_welfare",
+    "user_favorite_welfare_email_welfare_key",
+    "user_favorite_welfare_recent_idx",
+)
+
+
+# 같은 email 중 location / age 가 채워진 행, 그다음 ctid 가 큰 행 하나만 남긴다
+DEDUPE_USERINFORM_SQL = """
+DELETE FROM userinform u
+USING (
+    SELECT ctid, row_number() OVER (
+        PARTITION BY email
+        ORDER BY (coalesce(location, '') <> '') DESC, (coalesce(age, 0) <> 0) DESC, ctid DESC
+    ) AS rank
+    FROM userinform
+) d
+WHERE u.ctid = d.ctid AND d.rank > 1
+"""
+
+
+@contextmanager
+def _autocommit() -> Iterator[Any]:
+    """풀 커넥션을 autocommit 으로 빌려서 cursor 를 준다 (반납 전에 원래대로)."""
+    with connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                yield cur
+        finally:
+            conn.autocommit = False
+
+
+def _drop_invalid_indexes(cur) -> None:
+    """CONCURRENTLY 생성이 실패하고 남긴 INVALID index 는 IF NOT EXISTS 를 막으므로 먼저 지운다."""
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+        """,
+        (list(REQUIRED_OBJECTS),),
+    )
+    for (name,) in cur.fetchall():
+        logger.warning("schema: dropping invalid index %s", name)
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def dedupe_userinform() -> int:
+    """userinform 의 중복 email 을 정리하고 지운 행 수를 돌려준다 (CLI 의 --dedupe-userinform)."""
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(DEDUPE_USERINFORM_SQL)
+        return cur.rowcount
+
+
+def migrate() -> int:
+    """적용에 성공한 단계 수."""
+    applied = 0
+    try:
+        with _autocommit() as cur:
+            _drop_invalid_indexes(cur)
+    except psycopg2.Error as exc:
+        logger.error("schema: invalid index cleanup failed: %s", exc)
+    for name, sql in MIGRATIONS:
+        try:
+            with _autocommit() as cur:
+                cur.execute(sql)
+            applied += 1
+            logger.info("schema: %s ok", name)
+        except psycopg2.Error as exc:
+            logger.error("schema: %s failed: %s", name, exc)
+    return applied
+
+
+def missing_objects() -> List[str]:
+    """없는 (또는 INVALID 인) REQUIRED_OBJECTS."""
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT name FROM unnest(%s::text[]) AS name
+            WHERE to_regclass(name) IS NULL
+               OR EXISTS (SELECT 1 FROM pg_index i WHERE i.indexrelid = to_regclass(name) AND NOT i.indisvalid)
+            """,
+            (list(REQUIRED_OBJECTS),),
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def check_schema() -> List[str]:
+    """
+    앱 기동용 확인. 없는 객체를 경고로 남기고 돌려준다 (기동은 막지 않음).
+    DB 에 연결할 수 없으면 (connection() 의 503 포함) 경고 후 빈 목록.
+    """
+    try:
+        missing = missing_objects()
+    except (HTTPException, psycopg2.Error) as exc:
+        detail = exc.detail if isinstance(exc, HTTPException) else exc
+        logger.warning("schema: check skipped, database unavailable: %s", detail)
+        return []
+    if missing:
+        logger.warning(
+            "schema: missing %s; run `python -m services.schema` "
+            "(duplicate userinform emails block userinform_email_key, see --dedupe-userinform)",
+            ", ".join(missing),
+        )
+    return missing
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(prog="python -m services.schema")
+    parser.add_argument(
+        "--dedupe-userinform",
+        action="store_true",
+        help="userinform 의 중복 email 을 한 행만 남기고 지운 뒤 적용",
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    if args.dedupe_userinform:
+        print(f"userinform: {dedupe_userinform()} duplicate rows deleted")
+    print(f"{migrate()}/{len(MIGRATIONS)} applied")
+    missing = missing_objects()
+    print(f"missing: {', '.join(missing)}" if missing else "schema ready")
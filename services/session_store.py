@@ -0,0 +1,369 @@
+# services/session_store.py
+"""
+챗봇 세션 저장소.
+
+- InMemorySessionStore : 워커 1개용. LRU 로 세션 수 상한 + 주기적 TTL 정리(reaper)
+- SqliteSessionStore   : 같은 호스트의 여러 워커가 공유 (로컬 / 테스트용 stand-in)
+- PostgresSessionStore : 여러 호스트가 공유 (chat_sessions 테이블)
+
+세션 구조:
+    {
+        "messages": [ {role, content}, ... ],
+        "updated_at": float,
+        "context": {...},   # 챗봇이 채우는 프로필/복지 컨텍스트 스냅샷 (선택)
+    }
+
+모든 저장소는 commit() 시점에 세션당 메시지 수 / 바이트 상한을 적용한다.
+SESSION_STORE=memory|sqlite|postgres 로 선택.
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from core.config import env_float, env_int
+from core.lanes import run_in_lane
+
+logger = logging.getLogger(__name__)
+
+Session = Dict[str, Any]
+
+SESSION_TTL = env_float("SESSION_TTL", 300.0)  # 5분
+
+
+def new_session_id() -> str:
+    return str(uuid4())
+
+
+def new_session(now: Optional[float] = None) -> Session:
+    return {
+        "messages": [],
+        "updated_at": now if now is not None else time.time(),
+    }
+
+
+def _message_bytes(message: Dict[str, Any]) -> int:
+    return len((message.get("content") or "").encode("utf-8"))
+
+
+def session_bytes(session: Session) -> int:
+    return sum(_message_bytes(m) for m in session.get("messages", []))
+
+
+def trim_session(session: Session, max_messages: int, max_bytes: int) -> None:
+    """상한을 넘으면 가장 오래된 메시지부터 버린다 (user/assistant 짝 단위)."""
+    messages: List[Dict[str, Any]] = session["messages"]
+    total = session_bytes(session)
+    while messages and (len(messages) > max_messages or total > max_bytes):
+        drop = 2 if len(messages) >= 2 else 1
+        for m in messages[:drop]:
+            total -= _message_bytes(m)
+        del messages[:drop]
+
+
+class SessionStore(abc.ABC):
+    """세션 저장소 인터페이스 (아래 abstractmethod 를 모두 구현해야 인스턴스를 만들 수 있다)."""
+
+    # True 면 I/O 가 있어서 async 코드에서는 a* 메서드(스레드 offload)를 써야 함
+    blocking = False
+    # offload 할 core.lanes lane (세션은 챗봇 전용이므로 llm lane)
+    lane = "llm"
+
+    def __init__(self, ttl: float = SESSION_TTL, max_messages: int = 40, max_bytes: int = 64 * 1024):
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+
+    # --- 구현체가 채우는 부분 ---
+    @abc.abstractmethod
+    def load(self, session_id: str) -> Optional[Session]:
+        ...
+
+    @abc.abstractmethod
+    def save(self, session_id: str, session: Session) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def reap(self) -> int:
+        """TTL 지난 세션 삭제, 삭제 개수 반환."""
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    # --- 공통 로직 ---
+    def get_or_create(self, session_id: Optional[str]) -> Tuple[str, Session]:
+        now = time.time()
+
+        # 1) 세션 없음 → 새로 생성
+        session = self.load(session_id) if session_id else None
+        if session is None:
+            sid = new_session_id()
+            session = new_session(now)
+            self.save(sid, session)
+            return sid, session
+
+        # 2) TTL 이상 대화 없음 → 히스토리 초기화
+        if now - session["updated_at"] > self.ttl:
+            session = new_session(now)
+            self.save(session_id, session)
+            return session_id, session
+
+        # 3) 정상 세션 → 시간만 갱신
+        session["updated_at"] = now
+        return session_id, session
+
+    def commit(self, session_id: str, session: Session) -> None:
+        """대화 한 턴이 끝난 뒤 상한 적용 + 저장."""
+        session["updated_at"] = time.time()
+        trim_session(session, self.max_messages, self.max_bytes)
+        self.save(session_id, session)
+
+    async def aload(self, session_id: str) -> Optional[Session]:
+        if self.blocking:
+            return await run_in_lane(self.lane, self.load, session_id)
+        return self.load(session_id)
+
+    async def aget_or_create(self, session_id: Optional[str]) -> Tuple[str, Session]:
+        if self.blocking:
+            return await run_in_lane(self.lane, self.get_or_create, session_id)
+        return self.get_or_create(session_id)
+
+    async def acommit(self, session_id: str, session: Session) -> None:
+        if self.blocking:
+            await run_in_lane(self.lane, self.commit, session_id, session)
+        else:
+            self.commit(session_id, session)
+
+    async def areap(self) -> int:
+        if self.blocking:
+            return await run_in_lane(self.lane, self.reap)
+        return self.reap()
+
+
+# ============================
+# 메모리 저장소
+# ============================
+class InMemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int = 10_000, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.reaped = 0
+
+    def load(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session_id: str, session: Session) -> None:
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def reap(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if s["updated_at"] < cutoff]
+            for sid in expired:
+                del self._sessions[sid]
+        self.reaped += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        content = sum(session_bytes(s) for s in sessions)
+        return {
+            "backend": "memory",
+            "sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "messages": sum(len(s["messages"]) for s in sessions),
+            "content_bytes": content,
+            # dict/list 오버헤드까지 대략 포함한 추정치
+            "approx_memory_bytes": content + sum(
+                sys.getsizeof(s) + sys.getsizeof(s["messages"]) for s in sessions
+            ),
+            "evicted": self.evicted,
+            "reaped": self.reaped,
+            "ttl": self.ttl,
+        }
+
+
+# ============================
+# SQL 저장소 (공유)
+# ============================
+class _SQLSessionStore(SessionStore):
+    blocking = True
+    placeholder = "%s"
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.reaped = 0
+        self._table_ready = False
+
+    @abc.abstractmethod
+    def _raw_cursor(self):
+        """커밋 / 반납까지 책임지는 cursor 컨텍스트 매니저 (sqlite / postgres 가 구현)."""
+
+    @contextmanager
+    def _cursor(self) -> Iterator[Any]:
+        # import 시점이 아니라 첫 사용 때 테이블 생성
+        if not self._table_ready:
+            self._ensure_table()
+            self._table_ready = True
+        with self._raw_cursor() as cur:
+            yield cur
+
+    def _sql(self, sql: str) -> str:
+        return sql.replace("%s", self.placeholder)
+
+    def _ensure_table(self) -> None:
+        with self._raw_cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at DOUBLE PRECISION NOT NULL
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS chat_sessions_updated_at ON chat_sessions (updated_at)")
+
+    def load(self, session_id: str) -> Optional[Session]:
+        with self._cursor() as cur:
+            cur.execute(self._sql("SELECT data FROM chat_sessions WHERE session_id = %s"), (session_id,))
+            row = cur.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, session: Session) -> None:
+        with self._cursor() as cur:
+            cur.execute(
+                self._sql(
+                    """
+                    INSERT INTO chat_sessions (session_id, data, updated_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (session_id) DO UPDATE
+                    SET data = excluded.data, updated_at = excluded.updated_at
+                    """
+                ),
+                (session_id, json.dumps(session, ensure_ascii=False), session["updated_at"]),
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._cursor() as cur:
+            cur.execute(self._sql("DELETE FROM chat_sessions WHERE session_id = %s"), (session_id,))
+
+    def reap(self) -> int:
+        with self._cursor() as cur:
+            cur.execute(self._sql("DELETE FROM chat_sessions WHERE updated_at < %s"), (time.time() - self.ttl,))
+            n = cur.rowcount or 0
+        self.reaped += n
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cursor() as cur:
+            cur.execute("SELECT count(*), coalesce(sum(length(data)), 0) FROM chat_sessions")
+            count, size = cur.fetchone()
+        return {
+            "backend": self.backend,
+            "sessions": count,
+            "stored_bytes": int(size),
+            "reaped": self.reaped,
+            "ttl": self.ttl,
+        }
+
+
+class SqliteSessionStore(_SQLSessionStore):
+    backend = "sqlite"
+    placeholder = "?"
+
+    def __init__(self, path: str = "chat_sessions.sqlite3", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+
+    @contextmanager
+    def _raw_cursor(self) -> Iterator[Any]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 스레드마다 커넥션 하나 (sqlite3 커넥션은 스레드 간 공유 불가)
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        cur = conn.cursor()
+        try:
+            yield cur
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+class PostgresSessionStore(_SQLSessionStore):
+    backend = "postgres"
+
+    @contextmanager
+    def _raw_cursor(self) -> Iterator[Any]:
+        from core.db import connection
+
+        with connection() as conn, conn.cursor() as cur:
+            yield cur
+
+
+# ============================
+# 선택 + reaper
+# ============================
+def create_session_store() -> SessionStore:
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    common = dict(
+        ttl=SESSION_TTL,
+        max_messages=env_int("SESSION_MAX_MESSAGES", 40),
+        max_bytes=env_int("SESSION_MAX_BYTES", 64 * 1024),
+    )
+    if backend == "sqlite":
+        return SqliteSessionStore(path=os.getenv("SESSION_SQLITE_PATH", "chat_sessions.sqlite3"), **common)
+    if backend == "postgres":
+        return PostgresSessionStore(**common)
+    return InMemorySessionStore(max_sessions=env_int("SESSION_MAX_SESSIONS", 10_000), **common)
+
+
+async def run_reaper(store: SessionStore, interval: float) -> None:
+    """lifespan 에서 띄우는 백그라운드 TTL 정리 루프."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            n = await store.areap()
+            if n:
+                logger.info("session reaper removed %d expired sessions", n)
+        except Exception as exc:
+            logger.warning("session reaper failed: %s", exc)
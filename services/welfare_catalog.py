@@ -0,0 +1,206 @@
+# services/welfare_catalog.py
+"""
+지역(sigun_name)별 tbwelfaressrsm 카탈로그 캐시.
+
+- TTL + LRU 로 메모리 상한 유지 (지역별 락 / 마지막 version 도 같은 크기의 LRU)
+- WELFARE_CACHE_CHECK_INTERVAL 마다 가벼운 fingerprint 쿼리(count / max(version 컬럼))로
+  변경 여부만 확인하고, 바뀌었을 때만 전체를 다시 읽는다
+- WELFARE_VERSION_COLUMN (수정 시각 등, 행을 고치면 커지는 컬럼) 이 없으면 fingerprint 는
+  count(*) 뿐이라 행 추가 / 삭제만 보인다. 기존 행 수정은 WELFARE_CACHE_TTL 이 지나 다시 읽을 때 반영
+- 렌더링된 텍스트 같은 파생 데이터는 RegionCatalog.derive() 로 같이 캐싱
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from core.cache import TTLCache
+from core.config import env_float, env_int
+from core.db import connection
+
+logger = logging.getLogger(__name__)
+
+WELFARE_COLUMNS = (
+    "sigun_name",
+    "service_name",
+    "target",
+    "support_cycle",
+    "department",
+    "apply_method",
+    "service_url",
+)
+
+
+def sort_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    """keyset 페이지네이션 정렬 키 (service_name, service_url)."""
+    return (row.get("service_name") or "", row.get("service_url") or "")
+
+
+class RegionCatalog:
+    """한 지역의 복지 rows 스냅샷 + 파생 데이터."""
+
+    def __init__(self, sigun_name: str, rows: List[Dict[str, Any]], version: Tuple[Any, ...]):
+        self.sigun_name = sigun_name
+        self.rows = sorted(rows, key=sort_key)
+        self.keys = [sort_key(r) for r in self.rows]
+        self.version = version
+        now = time.monotonic()
+        self.loaded_at = now
+        self.checked_at = now
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def derive(self, name: str, fn: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+        """fn(rows) 결과를 이 스냅샷 수명 동안 한 번만 계산."""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = fn(self.rows)
+            return self._derived[name]
+
+    def derived(self, name: str) -> Any:
+        """이미 계산된 파생 데이터 (없으면 None)."""
+        return self._derived.get(name)
+
+
+def _version_column() -> Optional[str]:
+    """행 수정을 감지할 컬럼 (예: updated_at). 없으면 None → count(*) 만으로는 수정이 안 보인다."""
+    column = os.getenv("WELFARE_VERSION_COLUMN", "").strip()
+    if column and re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", column):
+        return column
+    return None
+
+
+def _version_sql() -> str:
+    column = _version_column()
+    if column:
+        return f"SELECT count(*), max({column}) FROM tbwelfaressrsm WHERE sigun_name = %s"
+    return "SELECT count(*) FROM tbwelfaressrsm WHERE sigun_name = %s"
+
+
+class WelfareCatalogCache:
+    def __init__(self, maxsize: int = 64, ttl: float = 3600.0, check_interval: float = 60.0):
+        self._cache: TTLCache[RegionCatalog] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.check_interval = check_interval
+        # 키가 사용자 프로필의 location 이므로 둘 다 LRU 로 상한을 둔다.
+        # 락이 쓰는 중에 밀려나도 같은 지역을 두 번 읽을 뿐이다.
+        self._region_locks: TTLCache[threading.Lock] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks_guard = threading.Lock()
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        # 지역별 마지막으로 읽은 version. TTL 만료 / LRU 로 스냅샷이 빠진 뒤 다시 읽어도
+        # 바뀐 걸 알아채고 알림을 보내기 위해 스냅샷보다 오래 (더 많이) 둔다.
+        self._versions: TTLCache[Tuple[Any, ...]] = TTLCache(maxsize=maxsize * 4, ttl=ttl * 24)
+        self.version_checks = 0
+        self.reloads = 0
+
+    def subscribe(self, listener: Callable[[Optional[str]], None]) -> None:
+        """지역 카탈로그가 바뀌거나 무효화될 때 listener(sigun_name) 호출 (None = 전체)."""
+        self._listeners.append(listener)
+
+    def _notify(self, sigun_name: Optional[str]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(sigun_name)
+            except Exception as exc:
+                logger.warning("welfare catalog listener failed for %s: %s", sigun_name, exc)
+
+    # ----------------------------
+    # DB 접근
+    # ----------------------------
+    @staticmethod
+    def _fetch_version(cur, sigun_name: str) -> Tuple[Any, ...]:
+        cur.execute(_version_sql(), (sigun_name,))
+        row = cur.fetchone()
+        if isinstance(row, dict):
+            return tuple(row.values())
+        return tuple(row)
+
+    @staticmethod
+    def _fetch_rows(cur, sigun_name: str) -> List[Dict[str, Any]]:
+        cur.execute(
+            f"""
+            SELECT {", ".join(WELFARE_COLUMNS)}
+            FROM tbwelfaressrsm
+            WHERE sigun_name = %s
+            """,
+            (sigun_name,),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+    def _region_lock(self, sigun_name: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._region_locks.peek(sigun_name)
+            if lock is None:
+                lock = threading.Lock()
+            # 쓸 때마다 다시 넣어서 LRU 순서 / TTL 갱신
+            self._region_locks.set(sigun_name, lock)
+            return lock
+
+    # ----------------------------
+    # public
+    # ----------------------------
+    def get(self, sigun_name: str) -> RegionCatalog:
+        """캐시된 카탈로그를 반환 (check_interval 이 지났으면 fingerprint 확인 후)."""
+        catalog = self._cache.get(sigun_name)
+        if catalog is not None and time.monotonic() - catalog.checked_at < self.check_interval:
+            return catalog
+
+        # 같은 지역에 대한 동시 miss 는 한 번만 DB 로
+        with self._region_lock(sigun_name):
+            # 위에서 이미 hit/miss 를 셌으므로 여기서는 통계 없이 다시 확인
+            catalog = self._cache.peek(sigun_name)
+            if catalog is not None and time.monotonic() - catalog.checked_at < self.check_interval:
+                return catalog
+            with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                return self._refresh(cur, sigun_name, catalog)
+
+    def peek(self, sigun_name: str) -> Optional[RegionCatalog]:
+        """DB 확인 없이 캐시에 있는 스냅샷만 (없으면 None, hit/miss 통계에는 넣지 않음)."""
+        return self._cache.peek(sigun_name)
+
+    def _refresh(self, cur, sigun_name: str, current: Optional[RegionCatalog]) -> RegionCatalog:
+        version = self._fetch_version(cur, sigun_name)
+        self.version_checks += 1
+        if current is not None and current.version == version:
+            current.checked_at = time.monotonic()
+            return current
+
+        catalog = RegionCatalog(sigun_name, self._fetch_rows(cur, sigun_name), version)
+        self.reloads += 1
+        self._cache.set(sigun_name, catalog)
+        previous = self._versions.peek(sigun_name)
+        self._versions.set(sigun_name, version)
+        if previous is not None and previous != version:
+            logger.info("welfare catalog for %s changed: %s -> %s", sigun_name, previous, version)
+            self._notify(sigun_name)
+        return catalog
+
+    def invalidate(self, sigun_name: Optional[str] = None) -> int:
+        if sigun_name is None:
+            removed = self._cache.clear()
+        else:
+            removed = 1 if self._cache.pop(sigun_name) is not None else 0
+        self._notify(sigun_name)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "check_interval": self.check_interval,
+            "version_checks": self.version_checks,
+            "reloads": self.reloads,
+            "version_column": _version_column(),
+            "versions_tracked": len(self._versions),
+        }
+
+
+catalog_cache = WelfareCatalogCache(
+    maxsize=env_int("WELFARE_CACHE_SIZE", 64),
+    ttl=env_float("WELFARE_CACHE_TTL", 3600.0),
+    check_interval=env_float("WELFARE_CACHE_CHECK_INTERVAL", 60.0),
+)
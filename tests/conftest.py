@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# 저장소 루트에 __init__.py 가 있어서 pytest 가 루트를 sys.path 에 넣지 않는다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
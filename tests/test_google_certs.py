@@ -0,0 +1,171 @@
+# tests/test_google_certs.py
+"""
+services.google_certs 를 로컬 키 서버(stand-in)로 검증.
+
+서버는 Google v1 certs 형식({kid: PEM 인증서})을 Cache-Control max-age 와 함께 돌려주고,
+테스트 중간에 키를 교체(rotation)한다.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("google.auth")
+pytest.importorskip("cryptography")
+
+from cryptography import x509  # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from cryptography.x509.oid import NameOID  # noqa: E402
+from google.auth import crypt as google_crypt  # noqa: E402
+from google.auth import jwt as google_jwt  # noqa: E402
+
+from services.google_certs import GoogleCertCache, GoogleTokenVerifier  # noqa: E402
+
+AUDIENCE = "test-client-id.apps.googleusercontent.com"
+
+
+class KeyPair:
+    def __init__(self, kid: str):
+        self.kid = kid
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(self.key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(self.key, hashes.SHA256())
+        )
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode("ascii")
+        self.private_pem = self.key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode("ascii")
+
+    def token(self, kid: str = None, **claims) -> str:
+        signer = google_crypt.RSASigner.from_string(self.private_pem, key_id=kid or self.kid)
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": AUDIENCE,
+            "sub": "1234567890",
+            "email": "user@example.com",
+            "iat": now,
+            "exp": now + 3600,
+            **claims,
+        }
+        return google_jwt.encode(signer, payload).decode("ascii")
+
+
+class KeyServer:
+    """현재 keys 를 돌려주는 로컬 HTTP 서버. hits 로 요청 수를 센다."""
+
+    def __init__(self, max_age: int = 3600):
+        self.keys: Dict[str, str] = {}
+        self.max_age = max_age
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                body = json.dumps(server.keys).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/certs"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "KeyServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture(scope="module")
+def k1() -> KeyPair:
+    return KeyPair("k1")
+
+
+@pytest.fixture(scope="module")
+def k2() -> KeyPair:
+    return KeyPair("k2")
+
+
+def test_rotated_kid_triggers_exactly_one_refresh(k1, k2):
+    with KeyServer() as server:
+        server.keys = {k1.kid: k1.cert_pem}
+        certs = GoogleCertCache(url=server.url, min_refresh_interval=0.0)
+        verifier = GoogleTokenVerifier(certs)
+
+        assert verifier.verify(k1.token(), AUDIENCE)["email"] == "user@example.com"
+        assert server.hits == 1
+        assert 3500 < certs.stats()["expires_in"] <= 3600  # Cache-Control max-age 를 따름
+
+        # Google 이 키를 교체: 새 kid 로 서명된 토큰은 강제 갱신 한 번으로 검증된다
+        server.keys = {k1.kid: k1.cert_pem, k2.kid: k2.cert_pem}
+        assert verifier.verify(k2.token(sub="rotated"), AUDIENCE)["sub"] == "rotated"
+        assert server.hits == 2
+        assert certs.forced_refreshes == 1
+
+        # 이후 같은 kid 의 다른 토큰은 캐시된 인증서로 (추가 요청 없음)
+        assert verifier.verify(k2.token(sub="again"), AUDIENCE)["sub"] == "again"
+        assert verifier.verify(k1.token(sub="old-key"), AUDIENCE)["sub"] == "old-key"
+        assert server.hits == 2
+        assert certs.forced_refreshes == 1
+
+
+def test_unknown_kid_refresh_is_rate_limited(k1, k2):
+    with KeyServer() as server:
+        server.keys = {k1.kid: k1.cert_pem}
+        certs = GoogleCertCache(url=server.url, min_refresh_interval=60.0)
+        verifier = GoogleTokenVerifier(certs)
+        certs.get()
+        assert server.hits == 1
+
+        # 마지막으로 받은 지 min_refresh_interval 이 지난 상태로
+        certs._fetched_at -= 61.0
+
+        # 서버에도 없는 kid: 첫 시도만 강제 갱신, 이후는 간격 안이라 외부 요청 없음
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                verifier.verify(k2.token(kid="unknown"), AUDIENCE)
+        assert server.hits == 2
+        assert certs.forced_refreshes == 1
+
+
+def test_verified_token_is_memoised(k1):
+    with KeyServer() as server:
+        server.keys = {k1.kid: k1.cert_pem}
+        certs = GoogleCertCache(url=server.url)
+        verifier = GoogleTokenVerifier(certs)
+        token = k1.token()
+
+        first = verifier.verify(token, AUDIENCE)
+        server.keys = {}  # 키가 사라져도 memo 된 결과는 exp 까지 그대로
+        assert verifier.verify(token, AUDIENCE) == first
+        assert server.hits == 1